@@ -4,7 +4,7 @@ from .question_selection import QuestionGenerator
 from .ifaces import IncorrectInputError, I_Response, I_Problem
 from .orthography_questions import QuestionGeneratorForOrthography, PlaceholderType
 from .analyze import UserContext
-from .logger import ResponseLogger
+from .logger import Durability, ResponseLogger
 
 __all__ = [
     "Question",
@@ -17,4 +17,5 @@ __all__ = [
     "PlaceholderType",
     "UserContext",
     "ResponseLogger",
+    "Durability",
 ]
@@ -1,61 +1,148 @@
 # This module contains a human-readable summary of the user's progress.
+import os
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from pydantic import TypeAdapter
 from rich.table import Table
 
 from .orthography_questions import QuestionGeneratorForOrthography
-from .question_selection import QuestionGenerator, QuestionWithScore
+from .persistence import journal_path, load_snapshot, replay_journal
+from .profiling import profiled
+from .question_selection import (
+    CORRECTNESS_QUANTILES,
+    QuestionWithScore,
+)
+
+
+# Identity of a file version: (inode, size, mtime in ns); None if it does not exist.
+FileSignature = tuple[int, int, int] | None
+
+
+def file_signature(path: Path) -> FileSignature:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
 
 
 class UserContext:
-    _gen: QuestionGenerator
+    """Read-only view of a state file that another process (`play`) keeps updating.
+
+    The files are only re-read when their signatures (see `file_signature`)
+    change. Answers appended to the journal are applied incrementally; a new
+    snapshot triggers a full reload.
+    """
+
+    _gen: QuestionGeneratorForOrthography
     _last_state: pd.DataFrame | None  # Columns: word, ok, bad, score, score_weight
     _last_report: Table | None
     _state_path: Path | None = None
 
     def __init__(self, state_json: Path):
         self._state_path = state_json
-        with open(state_json, "r") as file:
-            json = file.read()
-        self._gen = TypeAdapter(QuestionGeneratorForOrthography).validate_json(json)
         self._last_state = None
         self._last_report = None
+        self._last_report_key: tuple[int, int] | None = None  # (generation, depth)
+        self._generation = 0  # Incremented whenever the state changes.
+        self._current_state: pd.DataFrame | None = None
+        self._reload()
+
+    def _reload(self):
+        assert self._state_path is not None
+        # Signatures are taken before reading, so a write racing with the read is
+        # picked up by the next `refresh`.
+        self._snapshot_signature = file_signature(self._state_path)
+        self._journal_signature = file_signature(journal_path(self._state_path))
+        generator = load_snapshot(self._state_path)
+        self._journal_offset = replay_journal(generator, journal_path(self._state_path))
+        self._gen = generator
+
+    def refresh(self) -> bool:
+        """Brings the state up to date with the files; returns whether it changed."""
+        assert self._state_path is not None
+        snapshot = file_signature(self._state_path)
+        journal = file_signature(journal_path(self._state_path))
+        if snapshot != self._snapshot_signature:
+            self._reload()
+        elif journal == self._journal_signature:
+            return False
+        elif journal is not None and (
+            self._journal_signature is None
+            or (
+                journal[0] == self._journal_signature[0]
+                and journal[1] >= self._journal_offset
+            )
+        ):
+            # The journal was created or appended to: apply just the new answers.
+            start = 0 if self._journal_signature is None else self._journal_offset
+            self._journal_signature = journal
+            self._journal_offset = replay_journal(
+                self._gen,
+                journal_path(self._state_path),
+                start,
+            )
+        else:
+            self._reload()
+        self._generation += 1
+        self._current_state = None
+        return True
 
     def get_state(self) -> pd.DataFrame:
-        """Loads the current state into the Pandas DataFrame."""
-        with open(str(self._state_path), "r") as file:
-            json = file.read()
-        self._gen = TypeAdapter(QuestionGeneratorForOrthography).validate_json(json)
-        total_len = len(self._gen.questions)
-        worst_questions = self.worst_n_questions(total_len)
-        weights = self._gen.get_weights()
-
-        df = pd.DataFrame(
+        """Returns the current state as a Pandas DataFrame, reloading only on change."""
+        self.refresh()
+        if self._current_state is None:
+            self._current_state = self._build_state()
+        return self._current_state
+
+    @profiled("report.state")
+    def _build_state(self) -> pd.DataFrame:
+        """One row per question, worst first, built straight from the score arrays.
+
+        The index is the position in that order.
+        """
+        scores = self._gen.questions.scores
+        rows = self._gen.get_worst_rows(len(scores), add_salt=False, add_decay=False)
+        ok = scores.correct[rows]
+        bad = scores.incorrect[rows]
+        weights = np.asarray(self._gen.get_weights())[: len(rows)]
+        score_weight = np.zeros(len(rows))
+        score_weight[: len(weights)] = weights  # Already in descending order.
+
+        return pd.DataFrame(
             {
-                "word": [q.question.problem_ID for q in worst_questions],
-                "ok": [q.correct_count for q in worst_questions],
-                "bad": [q.incorrect_count for q in worst_questions],
-                "score": [q.get_correctness_score() for q in worst_questions],
-                "score_weight": [
-                    weights[i] if i < len(weights) else 0 for i in range(total_len)
-                ],
+                "word": np.asarray(scores.ids, dtype=object)[rows],
+                "ok": ok,
+                "bad": bad,
+                "score": CORRECTNESS_QUANTILES.quantiles(ok, bad),
+                "score_weight": score_weight,
             }
         )
 
-        df.sort_values(by="score_weight", ascending=False, inplace=True)
-        return df
-
     def worst_n_questions(self, n: int) -> list[QuestionWithScore]:
         return self._gen.get_worst_questions(n, add_salt=False, add_decay=False)
 
+    @profiled("report")
     def get_report(self, depth: int) -> Table:
-        """Generates a report of the user's progress."""
+        """Generates a report of the user's progress.
+
+        Lists the `depth` worst questions; `depth <= 0` lists the whole bank.
+        """
+        self.refresh()
+        if depth <= 0:
+            depth = len(self._gen)
+        last_report_key = self._last_report_key
+        self._last_report_key = (self._generation, depth)
+        if last_report_key == self._last_report_key:
+            assert self._last_report is not None
+            return self._last_report
         current_state = self.get_state()
-        if self._last_state is not None and not are_scores_different(
-            depth, self._last_state, current_state
+        if (
+            last_report_key is not None
+            and last_report_key[1] == depth
+            and self._last_state is not None
+            and not are_scores_different(depth, self._last_state, current_state)
         ):
             assert self._last_report is not None
             return self._last_report
@@ -73,103 +160,103 @@ class UserContext:
         table.add_column("ΔFailure", justify="right", style="dark_red")
         table.add_column("ΔSuccess", justify="right", style="dark_green")
 
-        for pos, q in enumerate(self.worst_n_questions(depth)):
-            alt_gen_pos = self._gen.clone()
-            alt_gen_pos.update_question(q.question, True)  # Assume all are correct
-            alt_gen_neg = self._gen.clone()
-            alt_gen_neg.update_question(q.question, False)  # Assume all are correct
-            alg_pos = alt_gen_pos.get_score() - score
-            alg_neg = score - alt_gen_neg.get_score()
-
-            if self._last_state is not None:
-                # last_pos = self._last_state.loc[self._last_state['word'] == q.question.short_user_prompt_string()]
-                last_pos = self._last_state.index[
-                    self._last_state["word"] == q.question.problem_ID
-                ].tolist()
-                last_pos = last_pos[0] if last_pos else None
-
-            else:
-                last_pos = None
-
-            if last_pos is None:
-                change = "[green]New"
-                ok_field = str(q.correct_count)
-                bad_field = str(q.incorrect_count)
-                score_field = f"{q.get_correctness_score():.2%}"
-
-            else:
-                assert self._last_state is not None
-                if last_pos > pos:
-                    change = "[red bold]↑"
-                elif last_pos < pos:
-                    change = "[green bold]↓"
-                else:
-                    change = "[gray]="
-
-                last_ok = self._last_state.loc[last_pos]["ok"]
-                if last_ok > q.correct_count:
-                    ok_field = f"{last_ok}[red]–{last_ok - q.correct_count}"
-                elif last_ok < q.correct_count:
-                    ok_field = f"{last_ok}[green]+{q.correct_count - last_ok}"
-                else:
-                    ok_field = f"{last_ok}  "
-                last_bad = self._last_state.loc[last_pos]["bad"]
-                if last_bad > q.incorrect_count:
-                    bad_field = f"{last_bad}[green]+{last_bad - q.incorrect_count}"
-                elif last_bad < q.incorrect_count:
-                    bad_field = f"{last_bad}[red]–{q.incorrect_count - last_bad}"
-                else:
-                    bad_field = f"{last_bad}  "
-                last_score = self._last_state.loc[last_pos]["score"]
-                if last_score > q.get_correctness_score():
-                    score_field = f"{last_score:.2%}[red]–{(last_score - q.get_correctness_score()):.2%}"
-                elif last_score < q.get_correctness_score():
-                    score_field = f"{last_score:.2%}[green]+{(q.get_correctness_score() - last_score):.2%}"
-                else:
-                    score_field = f"{last_score:.2%}      "
-
-            table.add_row(
-                change,
-                q.question.short_user_prompt_string(),
-                ok_field,
-                bad_field,
-                score_field,
-                f"–{alg_neg:.2%}",
-                f"+{alg_pos:.2%}",
-            )
+        shown = current_state.iloc[:depth]
+        problem_IDs = shown["word"].tolist()
+        ok = shown["ok"].to_numpy()
+        bad = shown["bad"].to_numpy()
+        score = shown["score"].to_numpy()
+        gains = self._gen.score_deltas(True, problem_IDs)
+        losses = -self._gen.score_deltas(False, problem_IDs)
+
+        # Previous row of every shown question; -1 for new ones.
+        last_state = self._last_state
+        if last_state is not None:
+            last = pd.Index(last_state["word"]).get_indexer(shown["word"])
+        else:
+            last = np.full(len(shown), -1)
+        known = last >= 0
+        if last_state is not None:
+            last_pos = last_state.index.to_numpy()[last]
+            last_ok = last_state["ok"].to_numpy()[last]
+            last_bad = last_state["bad"].to_numpy()[last]
+            last_score = last_state["score"].to_numpy()[last]
+        else:
+            last_pos, last_ok, last_bad, last_score = -last, ok, bad, score
+        pos = np.arange(len(shown))
+
+        change = np.select(
+            [~known, last_pos > pos, last_pos < pos],
+            ["[green]New", "[red bold]↑", "[green bold]↓"],
+            "[gray]=",
+        )
+        ok_fields = _change_fields(known, last_ok, ok, "{}", "  ", "[green]+", "[red]–")
+        bad_fields = _change_fields(
+            known, last_bad, bad, "{}", "  ", "[red]–", "[green]+"
+        )
+        score_fields = _change_fields(
+            known, last_score, score, "{:.2%}", "      ", "[green]+", "[red]–"
+        )
+
+        for row in zip(
+            change.tolist(),
+            self._gen.questions.short_user_prompt_markups(problem_IDs),
+            ok_fields,
+            bad_fields,
+            score_fields,
+            _formatted(losses, "–{:.2%}"),
+            _formatted(gains, "+{:.2%}"),
+        ):
+            table.add_row(*row)
 
         self._last_state = current_state
         self._last_report = table
         return table
 
 
+def _formatted(values: np.ndarray, template: str) -> list[str]:
+    """`template.format(value)` of every value; equal values are formatted once."""
+    unique, inverse = np.unique(values, return_inverse=True)
+    texts = [template.format(value) for value in unique.tolist()]
+    return [texts[i] for i in inverse.tolist()]
+
+
+def _change_fields(
+    known: np.ndarray,
+    was: np.ndarray,
+    now: np.ndarray,
+    template: str,
+    padding: str,
+    increase: str,
+    decrease: str,
+) -> list[str]:
+    """Report cells: `now` for new rows, else `was` followed by the change, if any."""
+    now_texts = _formatted(now, template)
+    was_texts = _formatted(was, template)
+    change_texts = _formatted(np.abs(now - was), template)
+    signs = np.where(known, np.sign(now - was), 2).tolist()
+    return [
+        now_text
+        if sign == 2
+        else was_text + padding
+        if sign == 0
+        else was_text + (increase if sign > 0 else decrease) + change_text
+        for sign, was_text, now_text, change_text in zip(
+            signs, was_texts, now_texts, change_texts
+        )
+    ]
+
+
 def are_scores_different(
     depth: int, score1: pd.DataFrame, score2: pd.DataFrame
 ) -> bool:
-    """Compares two DataFrames to check if they are different."""
+    """Compares two DataFrames to check if they are different.
+
+    Only the scores of the first `depth + 1` rows are compared, matched by word.
+    """
     if score1.shape != score2.shape:
         return True
-    dic_score1 = {}
-    for i, (_, rec) in enumerate(score1.iterrows()):
-        if i > depth:
-            break
-        word1 = rec["word"]
-        dic_score1[word1] = rec["score"]
-
-    dic_score2 = {}
-    for i, (_, rec) in enumerate(score2.iterrows()):
-        if i > depth:
-            break
-        word2 = rec["word"]
-        dic_score2[word2] = rec["score"]
-
-    if len(dic_score1) != len(dic_score2):
+    top1 = score1.iloc[: depth + 1].set_index("word")["score"]
+    top2 = score2.iloc[: depth + 1].set_index("word")["score"].reindex(top1.index)
+    if top2.isna().any():
         return True
-
-    for word in dic_score1:
-        if word not in dic_score2:
-            return True
-        if not np.isclose(dic_score1[word], dic_score2[word]):
-            return True
-
-    return False
+    return not np.isclose(top1.to_numpy(), top2.to_numpy()).all()
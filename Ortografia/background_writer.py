@@ -0,0 +1,177 @@
+# A worker thread that takes the quiz's file writes off the thread that waits for
+# the user's answers.
+from __future__ import annotations
+
+import atexit
+import functools
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+from .fileutil import write_atomically
+
+DEFAULT_MAX_PENDING = 256
+
+Task = Callable[[], None]
+S = TypeVar("S")
+
+
+class _DeferringLock:
+    """A reentrant lock that holds back the tasks submitted by its owner.
+
+    The tasks are passed to `enqueue` after the outermost `release`, so a thread
+    never waits for room in the queue while it keeps the worker from taking a
+    snapshot.
+    """
+
+    def __init__(self, enqueue: Callable[[Task], None]):
+        self._lock = threading.RLock()
+        self._enqueue = enqueue
+        self._owner: Optional[int] = None
+        self._depth = 0
+        self._deferred: list[Task] = []
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not self._lock.acquire(blocking, timeout):
+            return False
+        self._owner = threading.get_ident()
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth:
+            self._lock.release()
+            return
+        deferred, self._deferred = self._deferred, []
+        self._owner = None
+        self._lock.release()
+        for task in deferred:
+            self._enqueue(task)
+
+    def defer(self, task: Task) -> bool:
+        """Holds back `task` if the calling thread owns the lock."""
+        if self._owner != threading.get_ident():
+            return False
+        self._deferred.append(task)
+        return True
+
+    def __enter__(self) -> _DeferringLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class BackgroundWriter:
+    """Runs submitted writes one by one, in submission order, on a worker thread.
+
+    Tasks wait in a bounded queue: `submit` blocks while `max_pending` of them are
+    waiting. Snapshots are coalesced: while a snapshot of a path is still waiting,
+    a newer one replaces it instead of being queued, so only the latest state gets
+    written. The worker takes a snapshot while it holds `lock`, and serializes and
+    writes it after releasing the lock; code that modifies the snapshotted objects
+    must hold `lock` as well, but only waits for the (cheap) copy. Tasks submitted
+    while holding `lock` are queued when it is released, so they cannot wait for a
+    worker that waits for the lock.
+
+    A failed task does not stop the worker; the first failure is re-raised by the
+    next `submit`, `flush` or `close`. `close` writes everything that is pending
+    and is also called at interpreter exit.
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING):
+        self._queue: queue.Queue[Optional[Task]] = queue.Queue(max_pending)
+        self.lock = _DeferringLock(self._queue.put)
+        # Path -> (snapshot, serialize, then) of the snapshots that are waiting to
+        # be written.
+        self._snapshots: dict[
+            Path,
+            tuple[Callable[[], Any], Callable[[Any], str | bytes], Optional[Task]],
+        ] = {}
+        self._snapshots_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="ortografia-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, task: Task) -> None:
+        """Queues `task`, blocking while the queue is full; holding `lock` defers
+        it to the release instead."""
+        if self._closed:
+            raise ValueError("The background writer is closed")
+        self._raise_error()
+        if not self.lock.defer(task):
+            self._queue.put(task)
+
+    def save_snapshot(
+        self,
+        path: Path,
+        snapshot: Callable[[], S],
+        serialize: Callable[[S], str | bytes],
+        then: Optional[Task] = None,
+    ) -> None:
+        """Atomically writes `serialize(snapshot())` to `path`, then calls `then`.
+
+        `snapshot` runs under `lock` and should only copy the state; `serialize`
+        runs without the lock. Replaces a snapshot of `path` that is still waiting
+        to be written.
+        """
+        with self._snapshots_lock:
+            waiting = path in self._snapshots
+            self._snapshots[path] = (snapshot, serialize, then)
+        if not waiting:
+            self.submit(functools.partial(self._write_snapshot, path))
+
+    def _write_snapshot(self, path: Path) -> None:
+        with self._snapshots_lock:
+            snapshot, serialize, then = self._snapshots.pop(path)
+        with self.lock:
+            state = snapshot()
+        write_atomically(path, serialize(state))
+        if then is not None:
+            then()
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                task()
+            except BaseException as e:
+                if self._error is None:
+                    self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("A background write failed") from error
+
+    def flush(self) -> None:
+        """Waits until every submitted write is done."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Finishes the pending writes and stops the worker; idempotent."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self) -> BackgroundWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,10 +1,161 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import numpy as np
 from scipy.special import betaincinv
 
 
+class BetaQuantileTable:
+    """Memoized quantiles of the Beta(1 + positive, 1 + negative) posterior.
+
+    The quantiles are tabulated for a grid of CI values. Quantiles for a CI
+    between two grid points are linearly interpolated; a grid with a single CI
+    gives exact values. Counts below `max_count` are stored in a dense table that
+    grows (by powers of two) only as far as the counts seen so far require.
+    Larger, rare counts are kept in a bounded LRU cache of `cache_size` entries.
+    """
+
+    def __init__(self, CIs: list[float], max_count: int = 128, cache_size: int = 4096):
+        self.CIs = np.asarray(sorted(CIs), dtype=float)
+        self.max_count = max_count
+        self.cache_size = cache_size
+        self._table = np.zeros((len(self.CIs), 0, 0))  # [CI, positive, negative]
+        self._large_counts: OrderedDict[tuple[int, int], np.ndarray] = OrderedDict()
+
+    def covers(self, CI: float) -> bool:
+        return bool(self.CIs[0] <= CI <= self.CIs[-1])
+
+    def _grow(self, count: int):
+        size = max(16, self._table.shape[1])
+        while size <= count:
+            size *= 2
+        size = min(size, self.max_count)
+        positive, negative = np.meshgrid(
+            np.arange(size), np.arange(size), indexing="ij"
+        )
+        self._table = betaincinv(
+            1 + positive[None, :, :],
+            1 + negative[None, :, :],
+            self.CIs[:, None, None],
+        )
+
+    def _large_count_row(self, positive: int, negative: int) -> np.ndarray:
+        key = (positive, negative)
+        row = self._large_counts.get(key)
+        if row is None:
+            row = betaincinv(1 + positive, 1 + negative, self.CIs)
+            self._large_counts[key] = row
+            if len(self._large_counts) > self.cache_size:
+                self._large_counts.popitem(last=False)
+        else:
+            self._large_counts.move_to_end(key)
+        return row
+
+    def _grid_position(self, CI: float | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the index of the grid point at or below CI, and the interpolation weight."""
+        if len(self.CIs) == 1:
+            return np.zeros(np.shape(CI), dtype=np.int64), np.zeros(np.shape(CI))
+        step = (self.CIs[-1] - self.CIs[0]) / (len(self.CIs) - 1)
+        position = (np.asarray(CI, dtype=float) - self.CIs[0]) / step
+        idx = np.clip(np.floor(position).astype(np.int64), 0, len(self.CIs) - 2)
+        return idx, position - idx
+
+    def quantile(self, positive: int, negative: int, CI: float | None = None) -> float:
+        """Scalar lookup; `CI` may be omitted for single-CI tables."""
+        if positive < self.max_count and negative < self.max_count:
+            if max(positive, negative) >= self._table.shape[1]:
+                self._grow(max(positive, negative))
+            row = self._table[:, positive, negative]
+        else:
+            row = self._large_count_row(positive, negative)
+        if CI is None or len(self.CIs) == 1:
+            return float(row[0])
+        idx, weight = self._grid_position(CI)
+        return float(row[idx] * (1 - weight) + row[idx + 1] * weight)
+
+    def quantiles(
+        self,
+        positive: np.ndarray,
+        negative: np.ndarray,
+        CI: float | np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Vectorized lookup; `CI` may be a scalar or an array matching the counts."""
+        positive = np.asarray(positive, dtype=np.int64)
+        negative = np.asarray(negative, dtype=np.int64)
+        grid_CI: float | np.ndarray = self.CIs[0] if CI is None else CI
+        idx, weight = self._grid_position(grid_CI)
+        idx, weight = (
+            np.broadcast_to(idx, positive.shape),
+            np.broadcast_to(weight, positive.shape),
+        )
+        upper_idx = np.minimum(idx + 1, len(self.CIs) - 1)
+
+        small = (positive < self.max_count) & (negative < self.max_count)
+        ans = np.empty(positive.shape, dtype=float)
+        if small.any():
+            p, n = positive[small], negative[small]
+            largest = max(int(p.max()), int(n.max()))
+            if largest >= self._table.shape[1]:
+                self._grow(largest)
+            lower = self._table[idx[small], p, n]
+            upper = self._table[upper_idx[small], p, n]
+            ans[small] = lower * (1 - weight[small]) + upper * weight[small]
+        for i in np.flatnonzero(~small):
+            row = self._large_count_row(int(positive[i]), int(negative[i]))
+            ans[i] = row[idx[i]] * (1 - weight[i]) + row[upper_idx[i]] * weight[i]
+        return ans
+
+
+_exact_tables: dict[float, BetaQuantileTable] = {}
+_interpolated_tables: list[BetaQuantileTable] = []
+
+
+def exact_quantile_table(CI: float) -> BetaQuantileTable:
+    """Returns the shared table of exact quantiles for `CI`, creating it if needed."""
+    table = _exact_tables.get(CI)
+    if table is None:
+        table = BetaQuantileTable([CI])
+        _exact_tables[CI] = table
+    return table
+
+
+def interpolated_quantile_table(
+    min_CI: float, max_CI: float, grid_size: int = 11
+) -> BetaQuantileTable:
+    """Returns the shared table interpolating quantiles for any CI in [min_CI, max_CI]."""
+    CIs = np.linspace(min_CI, max_CI, grid_size)
+    for table in _interpolated_tables:
+        if np.array_equal(table.CIs, CIs):
+            return table
+    table = BetaQuantileTable(list(CIs))
+    _interpolated_tables.append(table)
+    return table
+
+
 def question_score(
     positive_reviews_count: int, total_reviews_count: int, CI: float = 0.5
 ) -> float:
-    median = betaincinv(
-        1 + positive_reviews_count, 1 - positive_reviews_count + total_reviews_count, CI
-    )
+    negative_reviews_count = total_reviews_count - positive_reviews_count
+    if (table := _exact_tables.get(CI)) is not None:
+        return table.quantile(positive_reviews_count, negative_reviews_count)
+    for table in _interpolated_tables:
+        if table.covers(CI):
+            return table.quantile(positive_reviews_count, negative_reviews_count, CI)
+    median = betaincinv(1 + positive_reviews_count, 1 + negative_reviews_count, CI)
     return median
+
+
+def question_scores(
+    positive_reviews_count: np.ndarray,
+    total_reviews_count: np.ndarray,
+    CI: float | np.ndarray = 0.5,
+) -> np.ndarray:
+    """Vectorized `question_score`: one table lookup (or `betaincinv` call) for the whole batch."""
+    negative_reviews_count = total_reviews_count - positive_reviews_count
+    if np.ndim(CI) == 0 and (table := _exact_tables.get(float(CI))) is not None:
+        return table.quantiles(positive_reviews_count, negative_reviews_count)
+    for table in _interpolated_tables:
+        if table.covers(np.min(CI)) and table.covers(np.max(CI)):
+            return table.quantiles(positive_reviews_count, negative_reviews_count, CI)
+    return betaincinv(1 + positive_reviews_count, 1 + negative_reviews_count, CI)
@@ -0,0 +1,238 @@
+# Compact binary, memory-mappable alternative to the JSON quiz state.
+#
+# Layout: the 8-byte magic, a little-endian uint32 format version and uint32
+# header length, a JSON header, and then 8-byte aligned raw little-endian arrays.
+# The header holds `current_epoch`, the question count and, for every array, its
+# dtype, byte offset and length. Strings (words, problem IDs, ID suffixes and
+# placeholder contents) are stored once in a string table: a UTF-8 blob plus an
+# array of offsets.
+#
+# Version 2 stores every masked word with its placeholders once, in a table of
+# word specs (`s_*` and `ph_*` arrays); the questions made from a word refer to it
+# by index (`q_spec`). Only the current version is read.
+from __future__ import annotations
+
+import functools
+import json
+import mmap
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from .orthography_questions import (
+    CompactQuestionStore,
+    QuestionGeneratorForOrthography,
+    QuestionRecord,
+    WordSpec,
+)
+
+MAGIC = b"ORTOSTAT"
+FORMAT_VERSION = 2
+BINARY_SUFFIX = ".bin"
+
+_PREFIX = struct.Struct("<8sII")
+_ALIGNMENT = 8
+
+
+def is_binary_state(path: Path) -> bool:
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class _StringTable:
+    def __init__(self):
+        self._index: dict[str, int] = {}
+        self._strings: list[str] = []
+
+    def add(self, s: str) -> int:
+        idx = self._index.get(s)
+        if idx is None:
+            idx = len(self._strings)
+            self._index[s] = idx
+            self._strings.append(s)
+        return idx
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        encoded = [s.encode("utf-8") for s in self._strings]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def encode_generator(generator: QuestionGeneratorForOrthography) -> bytes:
+    """Serializes the generator into the binary state format."""
+    strings = _StringTable()
+    count = len(generator.questions)
+    columns = {
+        "q_id": np.empty(count, dtype="<i4"),
+        "q_spec": np.empty(count, dtype="<i4"),
+        "q_target": np.empty(count, dtype="<i2"),
+        "q_suffix": np.empty(count, dtype="<i4"),
+        "q_correct": np.empty(count, dtype="<i4"),
+        "q_incorrect": np.empty(count, dtype="<i4"),
+        "q_last_epoch": np.empty(count, dtype="<i8"),
+    }
+    spec_index: dict[WordSpec, int] = {}
+    s_word: list[int] = []
+    s_ph_start: list[int] = [0]
+    ph_pos: list[int] = []
+    ph_type: list[int] = []
+    ph_value: list[bool] = []
+    ph_content: list[int] = []
+    scores = generator.questions.scores
+    columns["q_correct"][:] = scores.correct
+    columns["q_incorrect"][:] = scores.incorrect
+    columns["q_last_epoch"][:] = scores.last_epoch
+    for row, (problem_ID, (spec, target, suffix)) in enumerate(
+        generator.questions.records()
+    ):
+        spec_idx = spec_index.get(spec)
+        if spec_idx is None:
+            spec_idx = len(s_word)
+            spec_index[spec] = spec_idx
+            word, placeholders = spec
+            s_word.append(strings.add(word))
+            for pos, type_value, value, content in placeholders:
+                ph_pos.append(pos)
+                ph_type.append(type_value)
+                ph_value.append(value)
+                ph_content.append(strings.add(content))
+            s_ph_start.append(len(ph_pos))
+        columns["q_id"][row] = strings.add(problem_ID)
+        columns["q_spec"][row] = spec_idx
+        columns["q_target"][row] = target
+        columns["q_suffix"][row] = strings.add(suffix)
+    columns["s_word"] = np.array(s_word, dtype="<i4")
+    columns["s_ph_start"] = np.array(s_ph_start, dtype="<i4")
+    columns["ph_pos"] = np.array(ph_pos, dtype="<i4")
+    columns["ph_type"] = np.array(ph_type, dtype="<i1")
+    columns["ph_value"] = np.array(ph_value, dtype=np.uint8)
+    columns["ph_content"] = np.array(ph_content, dtype="<i4")
+    columns["str_blob"], columns["str_offsets"] = strings.arrays()
+
+    return _pack({"current_epoch": generator.current_epoch, "count": count}, columns)
+
+
+def _pack(meta: dict, columns: dict[str, np.ndarray]) -> bytes:
+    def align(n: int) -> int:
+        return -(-n // _ALIGNMENT) * _ALIGNMENT
+
+    layout = {}
+    offset = 0
+    for name, array in columns.items():
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "offset": offset,
+            "length": len(array),
+        }
+        offset = align(offset + array.nbytes)
+    header = json.dumps(dict(meta, arrays=layout)).encode("utf-8")
+    data_start = align(_PREFIX.size + len(header))
+
+    buffer = bytearray(data_start + offset)
+    _PREFIX.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, len(header))
+    buffer[_PREFIX.size : _PREFIX.size + len(header)] = header
+    for name, array in columns.items():
+        start = data_start + layout[name]["offset"]
+        buffer[start : start + array.nbytes] = array.tobytes()
+    return bytes(buffer)
+
+
+class BinaryState:
+    """Read-only view of a binary state file, memory-mapped rather than read.
+
+    Opening the file only parses the small header; the column arrays are NumPy
+    views into the mapping, so pages are loaded lazily by the OS as they are used.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary quiz state")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary state version {version} in {path}")
+        header = json.loads(
+            bytes(self._mmap[_PREFIX.size : _PREFIX.size + header_length])
+        )
+        data_start = -(-(_PREFIX.size + header_length) // _ALIGNMENT) * _ALIGNMENT
+        self.current_epoch: int = header["current_epoch"]
+        self.count: int = header["count"]
+        self.arrays: dict[str, np.ndarray] = {
+            name: np.frombuffer(
+                self._mmap,
+                dtype=np.dtype(spec["dtype"]),
+                count=spec["length"],
+                offset=data_start + spec["offset"],
+            )
+            for name, spec in header["arrays"].items()
+        }
+        # Sibling questions refer to the same word spec; decode it once for them.
+        self._spec = functools.lru_cache(maxsize=4096)(self._decode_spec)
+
+    def string(self, idx: int) -> str:
+        offsets = self.arrays["str_offsets"]
+        start, end = int(offsets[idx]), int(offsets[idx + 1])
+        return self.arrays["str_blob"][start:end].tobytes().decode("utf-8")
+
+    def strings(self) -> list[str]:
+        """Decodes the whole string table at once."""
+        blob = self.arrays["str_blob"].tobytes()
+        offsets = self.arrays["str_offsets"].tolist()
+        return [
+            blob[start:end].decode("utf-8")
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+    def _placeholders(self, start: int, end: int) -> tuple:
+        a = self.arrays
+        return tuple(
+            (pos, type_value, bool(value), self.string(content))
+            for pos, type_value, value, content in zip(
+                a["ph_pos"][start:end].tolist(),
+                a["ph_type"][start:end].tolist(),
+                a["ph_value"][start:end].tolist(),
+                a["ph_content"][start:end].tolist(),
+            )
+        )
+
+    def _decode_spec(self, spec_idx: int) -> WordSpec:
+        a = self.arrays
+        start, end = int(a["s_ph_start"][spec_idx]), int(a["s_ph_start"][spec_idx + 1])
+        return self.string(int(a["s_word"][spec_idx])), self._placeholders(start, end)
+
+    def record(self, row: int) -> QuestionRecord:
+        """Decodes one question record straight from the mapped columns."""
+        a = self.arrays
+        spec = self._spec(int(a["q_spec"][row]))
+        return spec, int(a["q_target"][row]), self.string(int(a["q_suffix"][row]))
+
+    def to_generator(self) -> QuestionGeneratorForOrthography:
+        """Builds a generator whose questions are read from this file on demand.
+
+        Only the problem IDs and the counters are loaded up front. That is still
+        O(n): the string table is decoded, the IDs are indexed and the counters
+        are copied out of the mapping, so that answers do not write to the file.
+        The file must stay mapped for as long as the generator is in use.
+        """
+        strings = self.strings()
+        store = CompactQuestionStore.from_source(
+            self,
+            [strings[idx] for idx in self.arrays["q_id"].tolist()],
+            self.arrays["q_correct"],
+            self.arrays["q_incorrect"],
+            self.arrays["q_last_epoch"],
+        )
+        return QuestionGeneratorForOrthography(
+            questions=store, current_epoch=self.current_epoch
+        )
+
+    def close(self):
+        """Unmaps the file; arrays obtained from `arrays` must not be used afterwards."""
+        self.arrays = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # Some array views are still alive; the mapping goes with them.
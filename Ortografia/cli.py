@@ -1,12 +1,23 @@
+import cProfile
+import contextlib
+
 import click
 from pathlib import Path
-from pydantic import TypeAdapter
 from rich.console import Console
+from rich.table import Table
 from rich.text import Text
 from .analyze import UserContext
+from .background_writer import BackgroundWriter
+from .dictionary_io import ENCODING, open_dictionary
 from .ifaces import I_Response, IncorrectInputError
-from .orthography_questions import QuestionGeneratorForOrthography, PlaceholderType
-from .logger import ResponseLogger
+from .orthography_questions import PlaceholderType
+from .logger import Durability, ResponseLogger
+from .orthography_questions import QuestionGeneratorForOrthography
+from . import profiling
+from .persistence import StateJournal, convert_state, load_state, save_state
+from .replay import REPLAY_CHUNK_SIZE, compare_states, replay_log
+from .response_log import ArchiveFormat
+from .simulation import LATENCY_PERCENTILES, run_simulation
 
 DEFAULT_STATE_PATH = Path(__file__).parent.parent / "tests" / "quiz_state.json"
 DEFAULT_DICTIONARY_FILE = Path(__file__).parent / "polish_frequent_words.txt"
@@ -14,8 +25,40 @@ DEFAULT_LOG_FILE = Path(__file__).parent.parent / "logs" / "responses.csv"
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Time the quiz's phases and print a summary at exit "
+    f"(also enabled by {profiling.PROFILE_ENV}=1).",
+)
+@click.option(
+    "--profile-json",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Also save the phase summary as JSON; implies --profile.",
+)
+@click.option(
+    "--cprofile",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Run the command under cProfile and save the stats (see pstats).",
+)
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    profile: bool,
+    profile_json: Path | None,
+    cprofile: Path | None,
+):
+    if profile or profile_json is not None:
+        profiling.enable(json_path=profile_json)
+    if cprofile is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def dump_stats():
+            profiler.disable()
+            profiler.dump_stats(cprofile)
+
+        ctx.call_on_close(dump_stats)
 
 
 @click.command()
@@ -26,6 +69,7 @@ def cli():
 )
 @click.argument("depth", type=int, default=20)
 def analyze(state_file: Path, depth: int):
+    """Prints the DEPTH worst questions (0 lists the whole bank)."""
     console = Console(color_system="truecolor")
     analyze = UserContext(state_file)
     console.print(analyze.get_report(depth))
@@ -39,7 +83,7 @@ def analyze(state_file: Path, depth: int):
 )
 @click.argument(
     "dictionary_file",
-    type=click.Path(exists=True, path_type=Path),
+    type=click.Path(exists=True, allow_dash=True, path_type=Path),
     default=DEFAULT_DICTIONARY_FILE,
 )
 @click.option(
@@ -48,7 +92,19 @@ def analyze(state_file: Path, depth: int):
     type=click.Choice(["RZ", "CH", "U"]),
     default=["RZ", "CH", "U"],
 )
-def load_dict(state_file: Path, dictionary_file: Path, placeholder_types: list[str]):
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes that parse the dictionary.",
+)
+def load_dict(
+    state_file: Path, dictionary_file: Path, placeholder_types: list[str], jobs: int
+):
+    """Adds the words of DICTIONARY_FILE to the state.
+
+    The dictionary may be compressed (.gz, .xz, .zst); "-" reads it from stdin.
+    """
     console = Console()
     placeholder_types_enum = []
     for placeholder_type in placeholder_types:
@@ -61,19 +117,30 @@ def load_dict(state_file: Path, dictionary_file: Path, placeholder_types: list[s
             )
 
     greeting = Text()
-    assert dictionary_file.is_file()
-    with open(state_file, "r") as file:
-        json = file.read()
-    generator = TypeAdapter(QuestionGeneratorForOrthography).validate_json(json)
+    generator = load_state(state_file)
     greeting.append("Welcome! Your last session has been restored from ")
-    rel_path = state_file.relative_to(Path(__file__).parent)
+    try:
+        rel_path = state_file.relative_to(Path(__file__).parent.parent)
+    except ValueError:
+        rel_path = state_file
     greeting.append(str(rel_path), "yellow")
     greeting.append(".")
-    added_count = generator.add_dictionary(dictionary_file, placeholder_types_enum)
+    if str(dictionary_file) == "-":
+        # Keeps stdin open when the `with` block ends.
+        dictionary = click.open_file("-", encoding=ENCODING)
+    else:
+        dictionary = open_dictionary(dictionary_file)
+    with dictionary as file:
+        report = generator.ingest(file, placeholder_types_enum, jobs)
 
     greeting.append(" ")
-    greeting.append(str(added_count), "red bold")
-    greeting.append(" new words added to the dictionary.\n")
+    greeting.append(str(report.added), "red bold")
+    greeting.append(" new words added to the dictionary")
+    greeting.append(
+        f" ({report.duplicates} duplicates, {report.invalid_words} invalid words).\n"
+    )
+    for example in report.error_examples:
+        greeting.append(f"  {example}\n", "yellow")
 
     greeting.append("You have given ")
     greeting.append(str(generator.current_epoch), "bold")
@@ -84,9 +151,7 @@ def load_dict(state_file: Path, dictionary_file: Path, placeholder_types: list[s
     greeting.append(".")
     console.print(greeting)
 
-    json = generator.model_dump_json()
-    with open(DEFAULT_STATE_PATH, "w") as file:
-        file.write(json)
+    save_state(generator, state_file)
 
     greeting = Text()
     greeting.append("New words have been saved into the session file")
@@ -105,7 +170,73 @@ def load_dict(state_file: Path, dictionary_file: Path, placeholder_types: list[s
     default=DEFAULT_LOG_FILE,
     help="Path to the log file for recording responses",
 )
-def play(state_file: Path, log_file: Path):
+@click.option(
+    "--journal/--no-journal",
+    default=False,
+    help="Append each answer to a journal instead of rewriting the whole state file.",
+)
+@click.option(
+    "--compact-every",
+    type=int,
+    default=500,
+    help="With --journal, fold the journal into a new state snapshot every N answers.",
+)
+@click.option(
+    "--log-buffer",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of responses buffered before they are written to the log file.",
+)
+@click.option(
+    "--log-flush-interval",
+    type=float,
+    default=None,
+    help="Write buffered responses once they are this many seconds old.",
+)
+@click.option(
+    "--log-durability",
+    type=click.Choice([d.value for d in Durability]),
+    default=Durability.FLUSH.value,
+    help="After each batch of responses: leave the log buffered (none), flush it to "
+    "the operating system (flush) or also sync it to disk (fsync).",
+)
+@click.option(
+    "--log-rotate-bytes",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Archive the log file once it has grown to this many bytes.",
+)
+@click.option(
+    "--log-rotate-interval",
+    type=float,
+    default=None,
+    help="Archive the log file once its oldest response is this many seconds old.",
+)
+@click.option(
+    "--log-archive",
+    type=click.Choice([a.value for a in ArchiveFormat]),
+    default=ArchiveFormat.GZIP.value,
+    help="Format of the archived log files: gzipped CSV or columnar NumPy segments.",
+)
+@click.option(
+    "--background-writes/--no-background-writes",
+    default=True,
+    help="Write the state and the log on a background thread instead of before "
+    "each prompt.",
+)
+def play(
+    state_file: Path,
+    log_file: Path,
+    journal: bool,
+    compact_every: int,
+    log_buffer: int,
+    log_flush_interval: float | None,
+    log_durability: str,
+    log_rotate_bytes: int | None,
+    log_rotate_interval: float | None,
+    log_archive: str,
+    background_writes: bool,
+):
     console = Console()
     greeting = Text()
     if not state_file.is_file():
@@ -114,12 +245,31 @@ def play(state_file: Path, log_file: Path):
     # Ensure log directory exists
     log_file.parent.mkdir(parents=True, exist_ok=True)
 
+    writer = BackgroundWriter() if background_writes else None
+    # Held while the generator changes, so background snapshots copy a consistent
+    # state; the worker only holds it for that copy.
+    state_lock = writer.lock if writer is not None else contextlib.nullcontext()
+
     # Initialize the logger
-    logger = ResponseLogger(log_file)
+    logger = ResponseLogger(
+        log_file,
+        buffer_size=log_buffer,
+        flush_interval=log_flush_interval,
+        durability=Durability(log_durability),
+        background_writer=writer,
+        rotate_bytes=log_rotate_bytes,
+        rotate_interval=log_rotate_interval,
+        archive=ArchiveFormat(log_archive),
+    )
 
-    with open(state_file, "r") as file:
-        json = file.read()
-    generator = TypeAdapter(QuestionGeneratorForOrthography).validate_json(json)
+    if journal:
+        state_journal = StateJournal(
+            state_file, compact_every=compact_every, background_writer=writer
+        )
+        generator = state_journal.open()
+    else:
+        state_journal = None
+        generator = load_state(state_file)
 
     # Set the logger for the generator
     generator.set_logger(logger)
@@ -142,60 +292,257 @@ def play(state_file: Path, log_file: Path):
     delta_score = 0
     response = None
 
-    while True:
-        with console.screen(hide_cursor=False):
-            response_text = Text()
-            if response is not None:
-                if response.is_correct:
-                    response_text.append("Correct", "bold green")
+    try:
+        while True:
+            with console.screen(hide_cursor=False):
+                response_text = Text()
+                if response is not None:
+                    if response.is_correct:
+                        response_text.append("Correct", "bold green")
+                    else:
+                        response_text.append("Incorrect", "bold red")
                 else:
-                    response_text.append("Incorrect", "bold red")
-            else:
-                response_text.append("Current score: ")
-
-            response_text.append(f"{generator.get_score():.1%}", "bold")
-            if delta_score < -0.0005:
-                response_text.append(" (")
-                response_text.append(f"{delta_score:.2%}", "red")
-                response_text.append(" change).")
-            elif delta_score > 0.0005:
-                response_text.append(" (")
-                response_text.append(f"{delta_score:.2%}", "green")
-                response_text.append(" change).")
-
-            console.print(response_text)
-
-            json = generator.model_dump_json()
-            with open(state_file, "w") as file:
-                file.write(json)
-
-            question = generator.get_question()
-
-            response = None
-            while True:
-                console.print(question.user_prompt_string())
-                answer = input("Your answer: ").strip()
-                try:
-                    response = question.parse_user_response(answer)
-                    # The actual logging happens in generator.update_question
-                except IncorrectInputError as e:
-                    console.print(str(e))
-                    continue
-                except Exception:
-                    raise
-                break
-
-            assert isinstance(response, I_Response)
-
-            previous_score = generator.get_score()
-            generator.update_question(question, response.is_correct)
-            current_score = generator.get_score()
-            delta_score = current_score - previous_score
+                    response_text.append("Current score: ")
+
+                response_text.append(f"{generator.get_score():.1%}", "bold")
+                if delta_score < -0.0005:
+                    response_text.append(" (")
+                    response_text.append(f"{delta_score:.2%}", "red")
+                    response_text.append(" change).")
+                elif delta_score > 0.0005:
+                    response_text.append(" (")
+                    response_text.append(f"{delta_score:.2%}", "green")
+                    response_text.append(" change).")
+
+                console.print(response_text)
+
+                if state_journal is None:
+                    with profiling.timed("play.save"):
+                        save_state(generator, state_file, background_writer=writer)
+
+                question = generator.get_question()  # Does not change the state.
+
+                response = None
+                while True:
+                    with profiling.timed("play.prompt"):
+                        console.print(question.user_prompt_string())
+                    answer = input("Your answer: ").strip()
+                    try:
+                        response = question.parse_user_response(answer)
+                        # The actual logging happens in generator.update_question
+                    except IncorrectInputError as e:
+                        console.print(str(e))
+                        continue
+                    except Exception:
+                        raise
+                    break
+
+                assert isinstance(response, I_Response)
+
+                with state_lock:
+                    previous_score = generator.get_score()
+                    epoch = generator.current_epoch
+                    generator.update_question(question, response.is_correct)
+                    if state_journal is not None:
+                        state_journal.record(
+                            generator, epoch, question.problem_ID, response.is_correct
+                        )
+                    current_score = generator.get_score()
+                delta_score = current_score - previous_score
+    finally:
+        # Ctrl-C lands here too; everything queued is written before exiting.
+        logger.close()
+        if state_journal is not None:
+            state_journal.close(generator)
+        if writer is not None:
+            writer.close()
+
+
+@click.command()
+@click.argument("source_file", type=click.Path(exists=True, path_type=Path))
+@click.argument("target_file", type=click.Path(path_type=Path))
+def convert(source_file: Path, target_file: Path):
+    """Converts a state file between JSON and the binary (.bin) format."""
+    convert_state(source_file, target_file)
+    Console().print(
+        Text.assemble("State saved into ", (str(target_file), "yellow"), ".")
+    )
+
+
+@click.command()
+@click.argument(
+    "log_file", type=click.Path(exists=True, path_type=Path), default=DEFAULT_LOG_FILE
+)
+@click.option(
+    "--dictionary",
+    "dictionary_files",
+    multiple=True,
+    type=click.Path(exists=True, path_type=Path),
+    default=[DEFAULT_DICTIONARY_FILE],
+    help="Dictionary the state was built from; repeat it for several, in load order.",
+)
+@click.option(
+    "--placeholder-types",
+    multiple=True,
+    type=click.Choice(["RZ", "CH", "U"]),
+    default=["RZ", "CH", "U"],
+)
+@click.option(
+    "--output",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Save the rebuilt state into this file.",
+)
+@click.option(
+    "--verify",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="Compare the rebuilt state with this state file.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=REPLAY_CHUNK_SIZE,
+    help="Number of log rows applied at once.",
+)
+def replay(
+    log_file: Path,
+    dictionary_files: list[Path],
+    placeholder_types: list[str],
+    output: Path | None,
+    verify: Path | None,
+    chunk_size: int,
+):
+    """Rebuilds the state from the dictionaries and the response log LOG_FILE."""
+    console = Console()
+    generator = QuestionGeneratorForOrthography()
+    placeholder_types_enum = [PlaceholderType[t] for t in placeholder_types]
+    for dictionary_file in dictionary_files:
+        generator.add_dictionary(dictionary_file, placeholder_types_enum)
+    report = replay_log(generator, log_file, chunk_size)
+
+    summary = Text()
+    summary.append(str(report.applied), "bold")
+    summary.append(f" of {report.rows} responses replayed onto ")
+    summary.append(str(len(generator.questions)), "bold")
+    summary.append(" questions")
+    if report.unknown_questions:
+        summary.append(f"; {report.unknown_questions} to unknown questions", "yellow")
+    summary.append(f". Your score is {generator.get_score():.1%}.")
+    console.print(summary)
+
+    if output is not None:
+        save_state(generator, output)
+        console.print(Text.assemble("State saved into ", (str(output), "yellow"), "."))
+    if verify is not None:
+        differences = compare_states(load_state(verify), generator)
+        for difference in differences[:10]:
+            console.print(f"  {difference}", style="yellow")
+        if differences:
+            raise click.ClickException(
+                f"The replayed state differs from {verify} in {len(differences)} places"
+            )
+        console.print(Text.assemble("The replayed state matches ", str(verify), "."))
+
+
+@click.command()
+@click.option(
+    "--questions",
+    type=click.IntRange(min=1),
+    default=1000,
+    help="Number of synthetic questions in the bank.",
+)
+@click.option("--answers", type=click.IntRange(min=1), default=10000)
+@click.option("--seed", type=int, default=0)
+@click.option(
+    "--dictionary",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="Use the questions of this dictionary instead of synthetic ones.",
+)
+@click.option(
+    "--learning-rate",
+    type=click.FloatRange(0, 1),
+    default=0.05,
+    help="Fraction by which the learner's error rate of a question drops per answer.",
+)
+@click.option(
+    "--report-every",
+    type=click.IntRange(min=1),
+    default=1000,
+    help="Record the score every N answers.",
+)
+@click.option(
+    "--json",
+    "json_file",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Also save the full report as JSON.",
+)
+def simulate(
+    questions: int,
+    answers: int,
+    seed: int,
+    dictionary: Path | None,
+    learning_rate: float,
+    report_every: int,
+    json_file: Path | None,
+):
+    """Benchmarks the question selection with a simulated learner."""
+    console = Console()
+    report = run_simulation(
+        questions, answers, seed, dictionary, learning_rate, report_every
+    )
+    console.print(
+        Text.assemble(
+            (str(report.answers), "bold"),
+            " answers to ",
+            (str(report.questions), "bold"),
+            f" questions in {report.seconds:.2f}s (bank built in "
+            f"{report.setup_seconds:.2f}s): ",
+            (f"{report.answers_per_second:,.0f} answers/s", "bold"),
+            ".",
+        )
+    )
+
+    latencies = Table(title="Latency (µs)")
+    latencies.add_column("Step")
+    for percentile in LATENCY_PERCENTILES:
+        latencies.add_column(
+            "max" if percentile == 100 else f"p{percentile}", justify="right"
+        )
+    for step, values in [
+        ("get_question", report.selection_us),
+        ("update_question", report.update_us),
+        ("get_score", report.score_us),
+    ]:
+        latencies.add_row(step, *(f"{values[p]:,.1f}" for p in LATENCY_PERCENTILES))
+    console.print(latencies)
+
+    trajectory = Table(title="Score trajectory")
+    trajectory.add_column("Answers", justify="right")
+    trajectory.add_column("Score", justify="right")
+    trajectory.add_column("True score", justify="right")
+    points = report.trajectory
+    shown = points[:: max(1, len(points) // 10)]
+    if shown[-1] is not points[-1]:
+        shown.append(points[-1])
+    for point in shown:
+        trajectory.add_row(
+            str(point.answers), f"{point.score:.2%}", f"{point.true_score:.2%}"
+        )
+    console.print(trajectory)
+
+    if json_file is not None:
+        json_file.write_text(report.model_dump_json(indent=2))
 
 
 cli.add_command(analyze)
 cli.add_command(load_dict)
 cli.add_command(play)
+cli.add_command(convert)
+cli.add_command(replay)
+cli.add_command(simulate)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,57 @@
+# Streaming access to dictionary files: one word per line, UTF-8, optionally
+# compressed with gzip (.gz), xz (.xz) or Zstandard (.zst).
+from __future__ import annotations
+
+import gzip
+import io
+import lzma
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+from pydantic import BaseModel
+
+ENCODING = "utf-8"
+MAX_ERROR_EXAMPLES = 10
+
+
+def open_dictionary(path: Path) -> IO[str]:
+    """Opens a dictionary file for lazy line-by-line reading, decompressing it by suffix."""
+    suffix = path.suffix.lower()
+    if suffix == ".gz":
+        return gzip.open(path, "rt", encoding=ENCODING)
+    if suffix == ".xz":
+        return lzma.open(path, "rt", encoding=ENCODING)
+    if suffix == ".zst":
+        try:
+            import zstandard  # pyright: ignore [reportMissingImports]
+        except ImportError as e:
+            raise ImportError(
+                f"Reading {path} requires the optional `zstandard` package "
+                "(the `zstd` extra)"
+            ) from e
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return io.TextIOWrapper(reader, encoding=ENCODING)
+    return open(path, "r", encoding=ENCODING)
+
+
+def iter_words(lines: Iterable[str]) -> Iterator[str]:
+    """Strips the lines of a dictionary and skips the blank ones."""
+    for line in lines:
+        word = line.strip()
+        if word:
+            yield word
+
+
+class IngestionReport(BaseModel):
+    """Aggregated outcome of adding a dictionary to a question bank."""
+
+    words: int = 0  # Non-blank words read.
+    added: int = 0  # New questions.
+    duplicates: int = 0  # Questions that were already in the bank.
+    invalid_words: int = 0  # Words that could not be turned into questions.
+    error_examples: list[str] = []  # The first `MAX_ERROR_EXAMPLES` error messages.
+
+    def record_error(self, word: str, error: Exception):
+        self.invalid_words += 1
+        if len(self.error_examples) < MAX_ERROR_EXAMPLES:
+            self.error_examples.append(f"{word}: {error}")
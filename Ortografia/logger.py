@@ -1,33 +1,129 @@
+from __future__ import annotations
+
+import atexit
 import csv
 import datetime
+import functools
+import gzip
+import os
+import threading
+import time
+from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Optional, TextIO
+
+from .fileutil import write_atomically
+from .profiling import profiled
+from .response_log import SEGMENT_SUFFIX, ArchiveFormat, rotated_log_path, write_segment
+
+if TYPE_CHECKING:
+    from .background_writer import BackgroundWriter
+
+HEADER = ["datetime", "epoch", "question_id", "given_answer", "is_correct"]
+
+
+class Durability(Enum):
+    """What happens to the log file after each batch of rows is written."""
+
+    NONE = "none"  # Left in the file object's buffer until it fills or is closed.
+    FLUSH = "flush"  # Handed to the operating system.
+    FSYNC = "fsync"  # Flushed and synced to disk.
 
 
 class ResponseLogger:
-    """A logger class for recording user responses to orthography questions."""
+    """A logger class for recording user responses to orthography questions.
 
-    def __init__(self, log_file: Optional[Path] = None):
+    The log file stays open and rows are buffered in memory; a batch is written
+    when `buffer_size` rows are pending, when `flush_interval` seconds have passed
+    since the last batch (by a timer thread while rows are pending), on `flush()`,
+    and on `close()`. The logger is closed at interpreter exit if it is still open. The
+    defaults write every response as soon as it is logged.
+
+    With `background_writer`, the batches are formatted and written on its worker
+    thread.
+
+    The log file is rotated once it has grown to `rotate_bytes` or holds responses
+    older than `rotate_interval` seconds (checked after each written batch): it
+    is moved aside and archived as `archive` (see `response_log.rotated_logs`),
+    and a new log file is started. `response_log.read_responses` reads the
+    archives and the current file together.
+    """
+
+    def __init__(
+        self,
+        log_file: Optional[Path] = None,
+        buffer_size: int = 1,
+        flush_interval: Optional[float] = None,
+        durability: Durability = Durability.FLUSH,
+        background_writer: Optional[BackgroundWriter] = None,
+        rotate_bytes: Optional[int] = None,
+        rotate_interval: Optional[float] = None,
+        archive: ArchiveFormat = ArchiveFormat.GZIP,
+    ):
         """Initialize the logger with a path to the log file.
 
         Args:
             log_file: Path to the log file. If None, a default path will be used.
+            buffer_size: Number of responses buffered before they are written.
+            flush_interval: Maximal age in seconds of the oldest buffered batch,
+                or None for no time limit.
+            durability: What to do with the file after each written batch.
+            background_writer: Worker that writes the batches, if any.
+            rotate_bytes: Size of the log file that triggers a rotation, if any.
+            rotate_interval: Age in seconds of the oldest response in the log file
+                that triggers a rotation, if any.
+            archive: Format of the rotated log files.
         """
         if log_file is None:
             log_file = Path.home() / "ortografia_responses.csv"
+        if buffer_size < 1:
+            raise ValueError(f"buffer_size must be positive, not {buffer_size}")
 
         self.log_file = log_file
-        self._ensure_log_file_exists()
-
-    def _ensure_log_file_exists(self) -> None:
-        """Ensure the log file exists and has proper headers."""
-        if not self.log_file.exists():
-            with open(self.log_file, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(
-                    ["datetime", "epoch", "question_id", "given_answer", "is_correct"]
-                )
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.background_writer = background_writer
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        self.archive = archive
+        # (time.time(), epoch, question_id, given_answer, is_correct); the time
+        # is only formatted when the row is written.
+        self._pending: list[tuple[float, int, str, str, bool]] = []
+        self._last_flush = time.monotonic()
+        self._closed = False
+        self._timer: Optional[threading.Timer] = None
+        # Guards the buffer against the flush timer. With a background writer it
+        # is the writer's lock, whose holder never waits for room in its queue.
+        self._lock = (
+            background_writer.lock
+            if background_writer is not None
+            else threading.RLock()
+        )
+        # Once the logger is set up, the file is only used by the thread that
+        # writes the batches (under `_lock` without a background writer).
+        self._file: TextIO = open(self.log_file, "a", encoding="utf-8", newline="")
+        self._file_started = self._ensure_log_file_exists()
+        atexit.register(self.close)
+
+    def _ensure_log_file_exists(self) -> float:
+        """Ensure the log file has proper headers.
+
+        Returns the time of its first response (now if it has none yet).
+        """
+        if self._file.tell() == 0:
+            csv.writer(self._file).writerow(HEADER)
+            self._sync()
+            return time.time()
+        with open(self.log_file, encoding="utf-8", newline="") as file:
+            rows = csv.reader(file)
+            next(rows, None)
+            first = next(rows, None)
+        if not first:
+            return time.time()
+        return datetime.datetime.fromisoformat(first[0]).timestamp()
 
+    @profiled("log")
     def log_response(
         self, epoch: int, question_id: str, given_answer: str, is_correct: bool
     ) -> None:
@@ -39,8 +135,119 @@ class ResponseLogger:
             given_answer: The answer provided by the user.
             is_correct: Whether the answer was correct.
         """
-        timestamp = datetime.datetime.now().isoformat()
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"Response log {self.log_file} is closed")
+            self._pending.append(
+                (time.time(), epoch, question_id, given_answer, is_correct)
+            )
+            if len(self._pending) >= self.buffer_size or self._flush_is_due():
+                self.flush()
+            else:
+                self._schedule_flush()
+
+    def flush(self) -> None:
+        """Write the buffered responses and apply the durability policy."""
+        with self._lock:
+            if self._closed:
+                return
+            if self._pending:
+                batch, self._pending = self._pending, []
+                self._run(functools.partial(self._write_rows, batch))
+            self._last_flush = time.monotonic()
+
+    def _flush_is_due(self) -> bool:
+        return (
+            self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def _schedule_flush(self) -> None:
+        """Starts the timer that writes the pending rows once they are due."""
+        if self.flush_interval is None or self._timer is not None:
+            return
+        delay = self._last_flush + self.flush_interval - time.monotonic()
+        self._timer = threading.Timer(max(delay, 0.0), self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._closed or not self._pending:
+                return
+            if self._flush_is_due():
+                self.flush()
+            else:  # Rows logged after a flush by size.
+                self._schedule_flush()
+
+    def _run(self, task: Callable[[], None]) -> None:
+        if self.background_writer is not None:
+            self.background_writer.submit(task)
+        else:
+            task()
+
+    @profiled("log.write")
+    def _write_rows(self, rows: list[tuple[float, int, str, str, bool]]) -> None:
+        fromtimestamp = datetime.datetime.fromtimestamp
+        csv.writer(self._file).writerows(
+            (fromtimestamp(timestamp).isoformat(), *row) for timestamp, *row in rows
+        )
+        self._sync()
+        if (
+            self.rotate_bytes is not None and self._file.tell() >= self.rotate_bytes
+        ) or (
+            self.rotate_interval is not None
+            and time.time() - self._file_started >= self.rotate_interval
+        ):
+            self._rotate()
+
+    def _sync(self) -> None:
+        if self.durability != Durability.NONE:
+            self._file.flush()
+            if self.durability == Durability.FSYNC:
+                os.fsync(self._file.fileno())
+
+    @profiled("log.rotate")
+    def _rotate(self) -> None:
+        """Archives the current log file and starts a new one."""
+        self._file.close()
+        rotated = rotated_log_path(self.log_file, datetime.datetime.now())
+        os.replace(self.log_file, rotated)
+        if self.archive == ArchiveFormat.COLUMNAR:
+            write_segment(rotated, rotated.with_suffix(SEGMENT_SUFFIX))
+        else:
+            with open(rotated, "rb") as source:
+                write_atomically(
+                    rotated.with_name(rotated.name + ".gz"),
+                    gzip.compress(source.read()),
+                )
+        # Until this point a crash leaves the rotated file as it is; the readers
+        # take it, or its archive once that has been written.
+        rotated.unlink()
+        self._file = open(self.log_file, "a", encoding="utf-8", newline="")
+        self._file_started = self._ensure_log_file_exists()
+
+    def _close_file(self) -> None:
+        self._file.close()
+
+    def close(self) -> None:
+        """Write the buffered responses and close the log file; idempotent."""
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self.flush()
+            finally:
+                self._closed = True
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                atexit.unregister(self.close)
+                self._run(self._close_file)
+
+    def __enter__(self) -> ResponseLogger:
+        return self
 
-        with open(self.log_file, "a", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([timestamp, epoch, question_id, given_answer, is_correct])
+    def __exit__(self, *exc_info) -> None:
+        self.close()
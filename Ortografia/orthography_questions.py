@@ -1,15 +1,41 @@
 from __future__ import annotations
 
+import functools
+import itertools
 import random
+import sys
+import unicodedata
+from array import array
 from builtins import enumerate
-from typing import override, Optional
-
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    override,
+    Optional,
+    Protocol,
+    Sequence,
+)
+
+import numpy as np
 from .ifaces import I_Response, I_Problem, IncorrectInputError
-from .question_selection import QuestionGenerator, QuestionWithScore
+from .question_selection import (
+    QuestionGenerator,
+    QuestionStore,
+    QuestionWithScore,
+    ScoreArrays,
+)
+from .dictionary_io import IngestionReport, iter_words, open_dictionary
 from .logger import ResponseLogger
+from .profiling import profiled
 from enum import Enum
-from pydantic import BaseModel
-from rich.text import Text
+from pydantic import BaseModel, ConfigDict, Field, GetCoreSchemaHandler
+from pydantic_core import core_schema
+from rich.markup import escape
+from rich.text import Span, Text
 import re
 from pathlib import Path
 
@@ -60,7 +86,197 @@ def build_regexp_from_placeholders(placeholders: list[PlaceholderType]) -> str:
     return regex
 
 
+# Placeholder as stored in a `CompactQuestionStore`:
+# (position in the word, PlaceholderType value, value, content).
+RawPlaceholder = tuple[int, int, bool, str]
+# A masked word with its placeholders, shared by all questions made from that word.
+WordSpec = tuple[str, tuple[RawPlaceholder, ...]]
+# A compact question: word spec, target placeholder index and ID suffix.
+QuestionRecord = tuple[WordSpec, int, str]
+
+DEFAULT_PLACEHOLDER_TYPES = (PlaceholderType.RZ, PlaceholderType.CH, PlaceholderType.U)
+NULL_CHAR = "_"
+
+# Placeholder type value, value and the canonical (shared) content string of every
+# matched (lower-case) spelling.
+_PLACEHOLDER_OF_CONTENT: dict[str, tuple[int, bool, str]] = {
+    content: (placeholder_type.value, value, content)
+    for content, placeholder_type, value in [
+        ("rz", PlaceholderType.RZ, True),
+        ("ż", PlaceholderType.RZ, False),
+        ("ch", PlaceholderType.CH, True),
+        ("h", PlaceholderType.CH, False),
+        ("u", PlaceholderType.U, True),
+        ("ó", PlaceholderType.U, False),
+    ]
+}
+
+
+@functools.lru_cache(maxsize=None)
+def placeholder_pattern(placeholder_types: tuple[PlaceholderType, ...]) -> re.Pattern:
+    return re.compile(
+        build_regexp_from_placeholders(list(placeholder_types)), re.IGNORECASE
+    )
+
+
+def tokenize_word(
+    word: str, placeholder_types: Iterable[PlaceholderType] | None = None
+) -> WordSpec:
+    """Splits `word` into the placeholded word and its placeholders in a single scan.
+
+    Every match of the placeholder pattern is replaced by `NULL_CHAR`; the
+    placeholders are `(position in the placeholded word, type value, value,
+    content)` tuples, in order.
+    """
+    return next(tokenize_words([word], placeholder_types))
+
+
+def tokenize_words(
+    words: Iterable[str],
+    placeholder_types: Iterable[PlaceholderType] | None = None,
+    on_error: Callable[[str, ValueError], None] | None = None,
+) -> Iterator[WordSpec]:
+    """Batch `tokenize_word`; the pattern is looked up once for the whole batch.
+
+    Without `on_error` an invalid word raises `ValueError`; with it, the word and
+    the error are passed to `on_error` and the word is skipped.
+    """
+    finditer = placeholder_pattern(
+        DEFAULT_PLACEHOLDER_TYPES
+        if placeholder_types is None
+        else tuple(placeholder_types)
+    ).finditer
+    for word in words:
+        try:
+            if NULL_CHAR in word:
+                raise ValueError(f"Word cannot contain '{NULL_CHAR}'")
+            pieces = []
+            placeholders = []
+            last_end = 0
+            shift = 0  # How much shorter the placeholded word is so far.
+            for match in finditer(word):
+                start, end = match.span()
+                content = word[start:end]
+                kind = _PLACEHOLDER_OF_CONTENT.get(content)
+                if kind is None:
+                    raise ValueError(f"Unknown placeholder {content}")
+                pieces.append(word[last_end:start])
+                placeholders.append((start - shift, *kind))
+                shift += end - start - 1
+                last_end = end
+        except ValueError as e:
+            if on_error is None:
+                raise
+            on_error(word, e)
+            continue
+        if not placeholders:
+            yield word, ()
+            continue
+        pieces.append(word[last_end:])
+        yield NULL_CHAR.join(pieces), tuple(placeholders)
+
+
+def spec_problem_IDs(spec: WordSpec) -> list[str]:
+    """Problem IDs (without an ID suffix) of the questions of a tokenized word, by target.
+
+    Equal to `OrthographyQuestion.problem_ID`: the word with the target placeholder
+    masked and the other placeholders filled in.
+    """
+    word, placeholders = spec
+    segments = word.split(NULL_CHAR)
+    contents = [content for _, _, _, content in placeholders]
+    ans = []
+    for target in range(len(placeholders)):
+        parts = [segments[0]]
+        for i, content in enumerate(contents):
+            parts.append(NULL_CHAR if i == target else content)
+            parts.append(segments[i + 1])
+        ans.append("".join(parts))
+    return ans
+
+
+INGEST_CHUNK_SIZE = 10000
+
+# A tokenized dictionary word: its spec, problem IDs by target (see `spec_problem_IDs`)
+# and the error that made it invalid (then the spec is `(word, ())`).
+TokenizedWord = tuple[WordSpec, list[str], Optional[ValueError]]
+
+
+def _tokenized(
+    words: Iterable[str], placeholder_types: Iterable[PlaceholderType] | None
+) -> Iterator[TokenizedWord]:
+    errors: list[TokenizedWord] = []
+
+    def on_error(word: str, error: ValueError):
+        errors.append(((word, ()), [], error))
+
+    for spec in tokenize_words(words, placeholder_types, on_error):
+        if errors:
+            yield from errors
+            errors.clear()
+        yield spec, spec_problem_IDs(spec), None
+    yield from errors
+
+
+def tokenize_chunk(
+    words: Sequence[str], placeholder_types: Iterable[PlaceholderType] | None = None
+) -> list[TokenizedWord]:
+    """Tokenizes a chunk of words, keeping invalid words in place; runs in the workers."""
+    return list(_tokenized(words, placeholder_types))
+
+
+def tokenize_stream(
+    words: Iterable[str],
+    placeholder_types: Iterable[PlaceholderType] | None = None,
+    jobs: int = 1,
+) -> Iterator[TokenizedWord]:
+    """Tokenizes `words`, in chunks spread over `jobs` worker processes if `jobs > 1`.
+
+    Results are yielded in input order whatever the number of jobs. At most
+    `2 * jobs` chunks are in flight, so memory use stays bounded for any input.
+    """
+    if placeholder_types is not None:
+        placeholder_types = tuple(placeholder_types)
+    if jobs <= 1:
+        yield from _tokenized(words, placeholder_types)
+        return
+    chunks = itertools.batched(words, INGEST_CHUNK_SIZE)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending: deque[Future[list[TokenizedWord]]] = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(tokenize_chunk, chunk, placeholder_types))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def normalize_answer(answer: str) -> str:
+    """Canonical form of a typed answer: stripped, NFC-normalized and case-folded."""
+    return unicodedata.normalize("NFC", answer.strip()).casefold()
+
+
+def answer_map(*answers: tuple[str, bool]) -> dict[str, bool]:
+    """Maps every accepted (normalized) answer to whether it is correct.
+
+    When two answers normalize to the same string, the earlier one wins.
+    """
+    ans: dict[str, bool] = {}
+    for answer, correct in answers:
+        ans.setdefault(normalize_answer(answer), correct)
+    return ans
+
+
+@functools.lru_cache(maxsize=None)
+def letter_answer_map(correct_letter: str, incorrect_letter: str) -> dict[str, bool]:
+    """`answer_map` of the letter answers, shared by every question with the same
+    options; it must not be modified."""
+    return answer_map((correct_letter, True), (incorrect_letter, False))
+
+
 class InputPlaceholder(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     placeholder_type: PlaceholderType
     value: bool = False  # True means the letter from the placeholder label, False means the alternative.
     content: str  # The correct string to be put into the placeholder
@@ -102,15 +318,51 @@ class InputPlaceholder(BaseModel):
     def correct_letter(self) -> str:
         return self._a_letter(incorrect=False)
 
+    def mask(self, mask_type: MaskType) -> str:
+        """What is shown in place of this placeholder for the given mask type."""
+        if mask_type == MaskType.PLACEHOLDER:
+            return "_"
+        elif mask_type == MaskType.CORRECT:
+            return self.correct_letter
+        elif mask_type == MaskType.INCORRECT:
+            return self.incorrect_letter
+        elif mask_type == MaskType.AMBIGUOUS:
+            return self.ambiguous_placeholder
+        else:
+            raise ValueError(f"Unknown mask type {mask_type}")
+
     @property
     def incorrect_letter(self) -> str:
         return self._a_letter(incorrect=True)
 
 
+@functools.lru_cache(maxsize=None)
+def intern_placeholder(type_value: int, value: bool, content: str) -> InputPlaceholder:
+    """The shared, immutable `InputPlaceholder` for a (type, value, content) triple.
+
+    Only a handful of distinct triples exist, so all questions share them.
+    """
+    return InputPlaceholder.model_construct(
+        placeholder_type=PlaceholderType(type_value), value=value, content=content
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def placeholder_tuple(
+    raw_placeholders: tuple[RawPlaceholder, ...],
+) -> tuple[tuple[int, InputPlaceholder], ...]:
+    """`OrthographyQuestion.placeholders` for raw placeholders, shared by the sibling
+    questions of a word (which are usually built close together)."""
+    return tuple(
+        (pos, intern_placeholder(type_value, value, content))
+        for pos, type_value, value, content in raw_placeholders
+    )
+
+
 class OrthographyQuestion(I_Problem):
     word: str  # String that contains placeholder character ("_") for the missing letter(s).
-    placeholders: list[
-        tuple[int, InputPlaceholder]
+    placeholders: tuple[
+        tuple[int, InputPlaceholder], ...
     ]  # Sorted by int, the index of the placeholder in the word.
     target_placeholder_idx: (
         int  # Index of the placeholder that the user should fill in.
@@ -122,87 +374,37 @@ class OrthographyQuestion(I_Problem):
     def FromStr(
         word: str, placeholder_types: list[PlaceholderType] | None = None
     ) -> list[OrthographyQuestion]:
-        if placeholder_types is None:
-            placeholder_types = [
-                PlaceholderType.RZ,
-                PlaceholderType.CH,
-                PlaceholderType.U,
-            ]
-        null_char = "_"
-        null_pattern = re.compile(null_char)
-        # Check if the word contains no null placeholders
-        if null_pattern.search(word) is not None:
-            raise ValueError(f"Word cannot contain '{null_char}'")
-
-        regexp = build_regexp_from_placeholders(placeholder_types)
-        pattern = re.compile(regexp, re.IGNORECASE)
-
-        matches = pattern.finditer(word)
-        #         matches = re.findall(pattern, word)
-        ans = []
+        return OrthographyQuestion.FromSpec(tokenize_word(word, placeholder_types))
 
-        # Replace the placeholders with the null character
-        placeholded_word = re.sub(pattern, null_char, word)
+    @staticmethod
+    def FromStrs(
+        words: Iterable[str], placeholder_types: list[PlaceholderType] | None = None
+    ) -> Iterator[list[OrthographyQuestion]]:
+        """Batch `FromStr`: yields the questions of each word, in order."""
+        for spec in tokenize_words(words, placeholder_types):
+            yield OrthographyQuestion.FromSpec(spec)
 
-        placeholded_matches = null_pattern.finditer(placeholded_word)
-        placeholders = []
+    @staticmethod
+    def FromSpec(spec: WordSpec) -> list[OrthographyQuestion]:
+        """One question per placeholder of a tokenized word (see `tokenize_word`).
 
-        for i, (match, placeholded_match) in enumerate(
-            zip(matches, placeholded_matches)
-        ):
-            start, end = match.span()
-            content = word[start:end]
-            start, end = placeholded_match.span()
-
-            if content == "rz" or content == "ż":
-                placeholders.append(
-                    (
-                        start,
-                        InputPlaceholder(
-                            placeholder_type=PlaceholderType.RZ,
-                            value=content.lower() == "rz",
-                            content=content,
-                        ),
-                    )
-                )
-            elif content == "ch" or content == "h":
-                placeholders.append(
-                    (
-                        start,
-                        InputPlaceholder(
-                            placeholder_type=PlaceholderType.CH,
-                            value=content.lower() == "ch",
-                            content=content,
-                        ),
-                    )
-                )
-            elif content == "u" or content == "ó":
-                placeholders.append(
-                    (
-                        start,
-                        InputPlaceholder(
-                            placeholder_type=PlaceholderType.U,
-                            value=content.lower() == "u",
-                            content=content,
-                        ),
-                    )
-                )
-            else:
-                raise ValueError(f"Unknown placeholder {content}")
-        for i in range(len(placeholders)):
-            question = OrthographyQuestion(
-                word=placeholded_word,
+        The questions share the word string and the placeholder tuple.
+        """
+        word, raw_placeholders = spec
+        placeholders = placeholder_tuple(raw_placeholders)
+        return [
+            OrthographyQuestion.model_construct(
+                word=word,
                 placeholders=placeholders,
                 target_placeholder_idx=i,
             )
-            # print(question.get_incorrect_word_str())
-            ans.append(question)
-        return ans
+            for i in range(len(placeholders))
+        ]
 
     def __init__(
         self,
         word: str,
-        placeholders: list[tuple[int, InputPlaceholder]],
+        placeholders: Sequence[tuple[int, InputPlaceholder]],
         target_placeholder_idx: int,
         id_suffix: str = "",
     ) -> None:
@@ -220,6 +422,15 @@ class OrthographyQuestion(I_Problem):
     @property
     @override
     def problem_ID(self) -> str:
+        return self._masked_target_str + self.id_suffix
+
+    # The word strings below are built once per question and kept in the instance
+    # `__dict__` (which pydantic leaves out of serialization and comparison). They
+    # depend only on `word`, `placeholders` and `target_placeholder_idx`, which do not
+    # change after construction; `id_suffix` is appended on every access instead.
+
+    @functools.cached_property
+    def _masked_target_str(self) -> str:
         ans = ""
         placeholder_idx = 0
         last_str_pos = 0
@@ -238,7 +449,7 @@ class OrthographyQuestion(I_Problem):
             placeholder_idx += 1
 
         ans += self.word[last_str_pos:]  # The rest of the word
-        return ans + self.id_suffix
+        return ans
 
     @override
     def user_prompt_string(self) -> Text:
@@ -251,21 +462,23 @@ class OrthographyQuestion(I_Problem):
         return self.get_word_masked_on_target()
 
     @override
+    @profiled("parse")
     def parse_user_response(self, answer: str) -> I_Response:
-        answer = answer.strip().lower()
-
-        if answer == self.target_placeholder.correct_letter:
-            response = OrthographyResponse(user_response_correct=True, question=self)
-        elif answer == self.target_placeholder.incorrect_letter:
-            response = OrthographyResponse(user_response_correct=False, question=self)
-        elif answer == self.get_correct_word_str():
-            response = OrthographyResponse(user_response_correct=True, question=self)
-        elif answer == self.get_incorrect_word_str():
-            response = OrthographyResponse(user_response_correct=False, question=self)
-        else:
+        answer = normalize_answer(answer)
+        target = self.target_placeholder
+        letters = letter_answer_map(target.correct_letter, target.incorrect_letter)
+        correct = letters.get(answer)
+        if correct is None:
+            correct = self._word_answer_map.get(answer)
+        if correct is None:
             raise IncorrectInputError(f"Unknown answer {answer}")
+        return OrthographyResponse(user_response_correct=correct, question=self)
 
-        return response
+    @functools.cached_property
+    def _word_answer_map(self) -> dict[str, bool]:
+        return answer_map(
+            (self.get_correct_word_str(), True), (self.get_incorrect_word_str(), False)
+        )
 
     def log_response(self, answer: str, epoch: int, is_correct: bool) -> None:
         """Log the user's response to this question.
@@ -314,6 +527,10 @@ class OrthographyQuestion(I_Problem):
         return ans
 
     def get_correct_word_str(self) -> str:
+        return self._correct_word_str
+
+    @functools.cached_property
+    def _correct_word_str(self) -> str:
         ans = ""
         placeholder_idx = 0
         last_str_pos = 0
@@ -331,6 +548,10 @@ class OrthographyQuestion(I_Problem):
         return ans
 
     def get_incorrect_word_str(self) -> str:
+        return self._incorrect_word_str
+
+    @functools.cached_property
+    def _incorrect_word_str(self) -> str:
         ans = ""
         placeholder_idx = 0
         last_str_pos = 0
@@ -350,6 +571,24 @@ class OrthographyQuestion(I_Problem):
         ans += self.word[last_str_pos:]  # The rest of the word
         return ans
 
+    @functools.cached_property
+    def _segments(self) -> tuple[str, ...]:
+        """The parts of `word` between the placeholders (one more than placeholders)."""
+        ans = []
+        last_str_pos = 0
+        for pos, _ in self.placeholders:
+            ans.append(self.word[last_str_pos:pos])
+            last_str_pos = pos + 1
+        ans.append(self.word[last_str_pos:])
+        return tuple(ans)
+
+    @functools.cached_property
+    def _rendered_words(
+        self,
+    ) -> dict[tuple[MaskStyle, MaskType, MaskStyle, MaskType], Text]:
+        return {}
+
+    @profiled("render")
     def render_word(
         self,
         mask_style_of_target: MaskStyle,
@@ -357,43 +596,41 @@ class OrthographyQuestion(I_Problem):
         mask_style_of_other: MaskStyle,
         mask_type_of_other: MaskType,
     ) -> Text:
+        """Renders the word with its placeholders masked as requested.
+
+        Each combination of masks is rendered once per question and the same `Text`
+        is returned on later calls, so treat it as read-only (`copy()` it before
+        modifying it).
+        """
+        key = (
+            mask_style_of_target,
+            mask_type_of_target,
+            mask_style_of_other,
+            mask_type_of_other,
+        )
+        ans = self._rendered_words.get(key)
+        if ans is None:
+            ans = self._render_word(*key)
+            self._rendered_words[key] = ans
+        return ans
+
+    def _render_word(
+        self,
+        mask_style_of_target: MaskStyle,
+        mask_type_of_target: MaskType,
+        mask_style_of_other: MaskStyle,
+        mask_type_of_other: MaskType,
+    ) -> Text:
+        target_style = mask_style_of_target.mask_string()
+        other_style = mask_style_of_other.mask_string()
         ans = Text()
-        placeholder_idx = 0
-        last_str_pos = 0
-        while placeholder_idx < len(self.placeholders):
-            placeholder = self.placeholders[placeholder_idx]
-            ans.append(
-                self.word[last_str_pos : placeholder[0]]
-            )  # Beginning of the word, excluding the first placeholder
+        for placeholder_idx, (_, placeholder) in enumerate(self.placeholders):
+            ans.append(self._segments[placeholder_idx])
             if self.target_placeholder_idx != placeholder_idx:
-                style = mask_style_of_other.mask_string()
-                if mask_type_of_other == MaskType.PLACEHOLDER:
-                    ans.append("_", style)
-                elif mask_type_of_other == MaskType.CORRECT:
-                    ans.append(placeholder[1].correct_letter, style)
-                elif mask_type_of_other == MaskType.INCORRECT:
-                    ans.append(placeholder[1].incorrect_letter, style)
-                elif mask_type_of_other == MaskType.AMBIGUOUS:
-                    ans.append(placeholder[1].ambiguous_placeholder, style)
-                else:
-                    raise ValueError(f"Unknown mask type {mask_type_of_other}")
+                ans.append(placeholder.mask(mask_type_of_other), other_style)
             else:
-                style = mask_style_of_target.mask_string()
-                if mask_type_of_target == MaskType.PLACEHOLDER:
-                    ans.append("_", style)
-                elif mask_type_of_target == MaskType.CORRECT:
-                    ans.append(placeholder[1].correct_letter, style)
-                elif mask_type_of_target == MaskType.INCORRECT:
-                    ans.append(placeholder[1].incorrect_letter, style)
-                elif mask_type_of_target == MaskType.AMBIGUOUS:
-                    ans.append(placeholder[1].ambiguous_placeholder, style)
-                else:
-                    raise ValueError(f"Unknown mask type {mask_type_of_target}")
-
-            last_str_pos = placeholder[0] + 1
-            placeholder_idx += 1
-
-        ans.append(self.word[last_str_pos:])
+                ans.append(placeholder.mask(mask_type_of_target), target_style)
+        ans.append(self._segments[-1])
         return ans
 
     def get_ambiguous_word(self) -> Text:
@@ -450,41 +687,420 @@ class _QuestionWithScore_Orthography(QuestionWithScore):
     question: OrthographyQuestion  # pyright: ignore [reportIncompatibleVariableOverride]
 
 
+class QuestionRecordSource(Protocol):
+    """Read-only, row-addressed source of question records, e.g. a mapped binary state."""
+
+    count: int
+
+    def record(self, row: int) -> QuestionRecord: ...
+
+
+class CompactQuestionStore(QuestionStore):
+    """Question container that keeps only a compact record per problem.
+
+    Every problem is stored as a reference to its (shared) word spec, the target
+    placeholder index and the ID suffix; the counters live in `scores`. Full
+    `_QuestionWithScore_Orthography` objects are built on access and the last
+    `cache_size` of them are kept in an LRU cache, so a session only pays for
+    the few hundred questions it actually touches. The first rows may be served
+    straight from a `QuestionRecordSource` (see `from_source`), so loading a
+    binary state builds no records; it is still O(n) in the number of questions,
+    which is the cost of the ID index and of copying the counters.
+
+    Counters of a materialized question are refreshed from `scores` whenever it
+    is fetched; use `QuestionGenerator.update_question` to change them.
+    Questions cannot be replaced or removed once added.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.scores = ScoreArrays()
+        self.cache_size = cache_size
+        self._source: Optional[QuestionRecordSource] = None
+        self._source_count = 0
+        self._specs: list[WordSpec] = []
+        self._spec_index: dict[WordSpec, int] = {}
+        self._spec_of = array("i")  # Local rows only, offset by `_source_count`.
+        self._target = array("h")
+        self._suffix: list[str] = []
+        self._cache: OrderedDict[int, _QuestionWithScore_Orthography] = OrderedDict()
+        # Base problem ID -> lowest ID suffix number that may still be free. Derived
+        # from the IDs alone, so it never needs to be saved; only colliding bases
+        # are listed.
+        self._next_suffix: dict[str, int] = {}
+
+    @staticmethod
+    def from_source(
+        source: QuestionRecordSource,
+        problem_IDs: list[str],
+        correct: np.ndarray,
+        incorrect: np.ndarray,
+        last_epoch: np.ndarray,
+    ) -> CompactQuestionStore:
+        ans = CompactQuestionStore()
+        ans._source = source
+        ans._source_count = source.count
+        ans.scores.ids = problem_IDs
+        ans.scores.index = {
+            problem_ID: row for row, problem_ID in enumerate(problem_IDs)
+        }
+        ans.scores._correct = np.array(correct, dtype=np.int64)
+        ans.scores._incorrect = np.array(incorrect, dtype=np.int64)
+        ans.scores._last_epoch = np.array(last_epoch, dtype=np.int64)
+        ans.scores.recompute_correctness_sum()
+        return ans
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.scores.ids)
+
+    def __contains__(self, problem_ID: object) -> bool:
+        return problem_ID in self.scores.index
+
+    def record(self, row: int) -> QuestionRecord:
+        if row < self._source_count:
+            assert self._source is not None
+            return self._source.record(row)
+        local = row - self._source_count
+        return (
+            self._specs[self._spec_of[local]],
+            self._target[local],
+            self._suffix[local],
+        )
+
+    def records(self) -> Iterator[tuple[str, QuestionRecord]]:
+        for row, problem_ID in enumerate(self.scores.ids):
+            yield problem_ID, self.record(row)
+
+    def free_id_suffix(self, base_ID: str) -> str:
+        """The first of "", "1", "2", ... that makes `base_ID` an unused problem ID.
+
+        IDs are never removed, so a suffix found taken stays taken and the search
+        resumes where the previous one for the same base ID stopped: repeated
+        collisions cost O(1) each instead of a scan over all earlier suffixes.
+        """
+        index = self.scores.index
+        n = self._next_suffix.get(base_ID, 0)
+        while base_ID + (str(n) if n else "") in index:
+            n += 1
+        if n:
+            self._next_suffix[base_ID] = n
+        return str(n) if n else ""
+
+    def word(self, problem_ID: str) -> str:
+        """The masked word of a problem, without materializing the question."""
+        return self.record(self.scores.index[problem_ID])[0][0]
+
+    def short_user_prompt(self, problem_ID: str) -> Text:
+        """The same `Text` as the question's `short_user_prompt_string`, without
+        materializing the question.
+
+        Other placeholders show their correct letters, so the prompt reads as the
+        problem ID without its suffix, with the one "_" highlighted.
+        """
+        suffix = self.record(self.scores.index[problem_ID])[2]
+        masked = problem_ID[: len(problem_ID) - len(suffix)]
+        pos = masked.index("_")
+        return Text(
+            masked, spans=[Span(pos, pos + 1, MaskStyle.BOLD_BLUE.mask_string())]
+        )
+
+    def short_user_prompt_markups(self, problem_IDs: Iterable[str]) -> list[str]:
+        """Batched `short_user_prompt`, as console markup strings.
+
+        Cheaper than building a `Text` per question for long tables.
+        """
+        index = self.scores.index
+        record = self.record
+        style = MaskStyle.BOLD_BLUE.mask_string()
+        ans = []
+        for problem_ID in problem_IDs:
+            suffix = record(index[problem_ID])[2]
+            masked = problem_ID[: len(problem_ID) - len(suffix)]
+            if "[" in masked:
+                masked = escape(masked)
+            ans.append(masked.replace("_", f"[{style}]_[/]", 1))
+        return ans
+
+    def _materialize(self, row: int) -> _QuestionWithScore_Orthography:
+        (word, placeholders), target, suffix = self.record(row)
+        question = OrthographyQuestion.model_construct(
+            word=word,
+            placeholders=placeholder_tuple(placeholders),
+            target_placeholder_idx=target,
+            id_suffix=suffix,
+        )
+        return _QuestionWithScore_Orthography.model_construct(
+            question=question,
+            correct_count=int(self.scores.correct[row]),
+            incorrect_count=int(self.scores.incorrect[row]),
+            last_epoch=int(self.scores.last_epoch[row]),
+        )
+
+    def __getitem__(self, problem_ID: str) -> _QuestionWithScore_Orthography:
+        row = self.scores.index[problem_ID]
+        q = self._cache.get(row)
+        if q is None:
+            q = self._materialize(row)
+            self._cache[row] = q
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(row)
+            q.correct_count = int(self.scores.correct[row])
+            q.incorrect_count = int(self.scores.incorrect[row])
+            q.last_epoch = int(self.scores.last_epoch[row])
+        return q
+
+    def __setitem__(self, problem_ID: str, value: QuestionWithScore):
+        question = value.question
+        assert isinstance(question, OrthographyQuestion)
+        self.add_record(
+            problem_ID,
+            (
+                (
+                    question.word,
+                    tuple(
+                        (
+                            pos,
+                            p.placeholder_type.value,
+                            p.value,
+                            p.content,
+                        )
+                        for pos, p in question.placeholders
+                    ),
+                ),
+                question.target_placeholder_idx,
+                question.id_suffix,
+            ),
+            value.correct_count,
+            value.incorrect_count,
+            value.last_epoch,
+        )
+
+    def add_record(
+        self,
+        problem_ID: str,
+        record: QuestionRecord,
+        correct_count: int = 0,
+        incorrect_count: int = 0,
+        last_epoch: int = 0,
+    ) -> int:
+        if problem_ID in self.scores.index:
+            raise ValueError(f"Question {problem_ID} is already in the store")
+        spec, target, suffix = record
+        spec_idx = self._spec_index.get(spec)
+        if spec_idx is None:
+            spec_idx = len(self._specs)
+            self._specs.append(spec)
+            self._spec_index[spec] = spec_idx
+        self._spec_of.append(spec_idx)
+        self._target.append(target)
+        self._suffix.append(suffix)
+        return self.scores.append(
+            problem_ID, correct_count, incorrect_count, last_epoch
+        )
+
+    def __delitem__(self, problem_ID: str):
+        raise TypeError("Questions cannot be removed from the store")
+
+    def copy(self) -> CompactQuestionStore:
+        """An independent store with the same questions and counters.
+
+        Copies the record columns and the score arrays as a whole (the word specs
+        and the record source are immutable and shared), so it is cheap enough to
+        take a snapshot of a large bank.
+        """
+        ans = CompactQuestionStore(cache_size=self.cache_size)
+        ans.scores = self.scores.copy()
+        ans._source = self._source
+        ans._source_count = self._source_count
+        ans._specs = list(self._specs)
+        ans._spec_index = dict(self._spec_index)
+        ans._spec_of = array("i", self._spec_of)
+        ans._target = array("h", self._target)
+        ans._suffix = list(self._suffix)
+        ans._next_suffix = dict(self._next_suffix)
+        return ans
+
+    def __copy__(self) -> CompactQuestionStore:
+        return self.copy()
+
+    def __deepcopy__(self, memo: dict) -> CompactQuestionStore:
+        return self.copy()
+
+    # Pydantic integration: the store (de)serializes to exactly the same structure as
+    # `dict[str, _QuestionWithScore_Orthography]`, so JSON states stay compatible.
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source_type: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                cls._serialize, info_arg=True
+            ),
+        )
+
+    @staticmethod
+    def _validate(value: Any) -> CompactQuestionStore:
+        if isinstance(value, CompactQuestionStore):
+            return value
+        try:
+            questions = dict(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Questions must be a mapping: {e!r}") from e
+        ans = CompactQuestionStore()
+        for problem_ID, q in questions.items():
+            if isinstance(q, QuestionWithScore):
+                ans[problem_ID] = q
+                continue
+            try:
+                record, counters = CompactQuestionStore._parse_record(q)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                # A ValueError is reported by pydantic as a validation error.
+                raise ValueError(f"Invalid question {problem_ID!r}: {e!r}") from e
+            ans.add_record(problem_ID, record, *counters)
+        return ans
+
+    @staticmethod
+    def _parse_record(q: Any) -> tuple[QuestionRecord, tuple[int, int, int]]:
+        """The record and the counters of a serialized `QuestionWithScore`."""
+        question = q["question"]
+        if isinstance(question, OrthographyQuestion):
+            question = question.model_dump()
+        spec = (
+            str(question["word"]),
+            tuple(
+                (
+                    int(pos),
+                    PlaceholderType(p["placeholder_type"]).value,
+                    bool(p.get("value", False)),
+                    sys.intern(p["content"]),
+                )
+                for pos, p in (
+                    (pos, p if isinstance(p, dict) else p.model_dump())
+                    for pos, p in question["placeholders"]
+                )
+            ),
+        )
+        record = (
+            spec,
+            int(question["target_placeholder_idx"]),
+            str(question.get("id_suffix", "")),
+        )
+        counters = (
+            int(q["correct_count"]),
+            int(q["incorrect_count"]),
+            int(q["last_epoch"]),
+        )
+        return record, counters
+
+    @staticmethod
+    def _serialize(
+        store: CompactQuestionStore, info: core_schema.SerializationInfo
+    ) -> dict[str, Any]:
+        in_json = info.mode_is_json()
+        correct = store.scores.correct.tolist()
+        incorrect = store.scores.incorrect.tolist()
+        last_epoch = store.scores.last_epoch.tolist()
+        ans = {}
+        for row, (problem_ID, ((word, placeholders), target, suffix)) in enumerate(
+            store.records()
+        ):
+            ans[problem_ID] = {
+                "question": {
+                    "word": word,
+                    "placeholders": [
+                        (
+                            pos,
+                            {
+                                "placeholder_type": type_value
+                                if in_json
+                                else PlaceholderType(type_value),
+                                "value": value,
+                                "content": content,
+                            },
+                        )
+                        for pos, type_value, value, content in placeholders
+                    ],
+                    "target_placeholder_idx": target,
+                    "id_suffix": suffix,
+                },
+                "correct_count": correct[row],
+                "incorrect_count": incorrect[row],
+                "last_epoch": last_epoch[row],
+            }
+        return ans
+
+
 class QuestionGeneratorForOrthography(QuestionGenerator):
-    questions: dict[str, _QuestionWithScore_Orthography] = {}  # pyright: ignore [reportIncompatibleVariableOverride]
+    questions: CompactQuestionStore = Field(default_factory=CompactQuestionStore)  # pyright: ignore [reportIncompatibleVariableOverride]
     _logger: Optional[ResponseLogger] = None
 
+    @override
+    def clone(self) -> QuestionGeneratorForOrthography:
+        """Returns a clone of the questions and counters, without the logger."""
+        return QuestionGeneratorForOrthography(
+            questions=self.questions.copy(), current_epoch=self.current_epoch
+        )
+
     def add_dictionary(
         self,
-        dictionary_path: Path,
+        dictionary: Path | Iterable[str],
         placeholder_types: list[PlaceholderType] | None = None,
+        jobs: int = 1,
     ) -> int:
-        with open(dictionary_path, "r") as file:
-            words = file.readlines()
-
-        added_count = 0
-
-        for word in words:
-            questions = OrthographyQuestion.FromStr(
-                word.strip(), placeholder_types=placeholder_types
-            )
-            for question in questions:
-                if (existing_q := self.questions.get(question.problem_ID)) is not None:
-                    if existing_q.question.word == question.word:
-                        print(
-                            f"Duplicate question {question.problem_ID} with word {question.word}"
-                        )
+        """Adds the words of a dictionary file (see `open_dictionary`) or of any
+        iterable of lines. Returns the number of new questions."""
+        if isinstance(dictionary, Path):
+            with open_dictionary(dictionary) as file:
+                return self.ingest(file, placeholder_types, jobs).added
+        return self.ingest(dictionary, placeholder_types, jobs).added
+
+    @profiled("ingest")
+    def ingest(
+        self,
+        lines: Iterable[str],
+        placeholder_types: list[PlaceholderType] | None = None,
+        jobs: int = 1,
+    ) -> IngestionReport:
+        """Streams `lines` (one word each) into the question bank.
+
+        Lines are consumed lazily, so memory use does not depend on the length of
+        the source. Duplicates and invalid words are counted, not printed. With
+        `jobs > 1` the words are tokenized in that many processes (see
+        `tokenize_stream`); the merge into the bank stays sequential and in input
+        order, so the result does not depend on `jobs`.
+        """
+        report = IngestionReport()
+        words = added = duplicates = (
+            0  # Plain locals: model attributes are slow to set.
+        )
+        for spec, problem_IDs, error in tokenize_stream(
+            iter_words(lines), placeholder_types, jobs
+        ):
+            words += 1
+            if error is not None:
+                report.record_error(spec[0], error)
+                continue
+            for target, problem_ID in enumerate(problem_IDs):
+                if problem_ID in self.questions:
+                    if self.questions.word(problem_ID) == spec[0]:
+                        duplicates += 1
                         continue
-                while question.problem_ID in self.questions:
-                    if question.id_suffix == "":
-                        question.id_suffix = "1"
-                    else:
-                        val = int(question.id_suffix)
-                        val += 1
-                        question.id_suffix = f"{val}"
-                self.add_question(question)
-                added_count += 1
-        return added_count
+                id_suffix = self.questions.free_id_suffix(problem_ID)
+                self._add_record(problem_ID + id_suffix, (spec, target, id_suffix))
+                added += 1
+        report.words, report.added, report.duplicates = words, added, duplicates
+        return report
+
+    def _add_record(self, problem_ID: str, record: QuestionRecord):
+        """`add_question` for a compact record, without building the question object."""
+        row = self.questions.add_record(problem_ID, record)
+        self._row_added(row)
 
     def set_logger(self, logger: ResponseLogger) -> None:
         """Set the logger for this question generator and all its questions.
@@ -0,0 +1,224 @@
+# Reading and writing of the quiz state: full JSON snapshots plus an optional
+# append-only journal of the answers given since the last snapshot.
+from __future__ import annotations
+
+import functools
+import json
+import os
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Iterator, Optional
+
+from pydantic import TypeAdapter
+
+from .fileutil import write_atomically
+from .binary_state import BINARY_SUFFIX, BinaryState, encode_generator, is_binary_state
+from .orthography_questions import QuestionGeneratorForOrthography
+from .profiling import profiled
+
+if TYPE_CHECKING:
+    from .background_writer import BackgroundWriter
+
+
+def journal_path(state_path: Path) -> Path:
+    """Path of the journal that accompanies the snapshot `state_path`."""
+    return state_path.with_name(state_path.name + ".journal")
+
+
+@profiled("state.load")
+def load_snapshot(state_path: Path) -> QuestionGeneratorForOrthography:
+    """Loads a state file, either JSON or binary (recognized by its magic bytes)."""
+    if is_binary_state(state_path):
+        # The generator keeps reading question records from the mapped file.
+        return BinaryState(state_path).to_generator()
+    with open(state_path, "r", encoding="utf-8") as file:
+        json_str = file.read()
+    return TypeAdapter(QuestionGeneratorForOrthography).validate_json(json_str)
+
+
+@profiled("state.encode")
+def encode_snapshot(
+    generator: QuestionGeneratorForOrthography, state_path: Path
+) -> str | bytes:
+    """The state file contents; binary if `state_path` ends with `BINARY_SUFFIX`, else JSON."""
+    if state_path.suffix == BINARY_SUFFIX:
+        return encode_generator(generator)
+    return generator.model_dump_json()
+
+
+def save_snapshot(generator: QuestionGeneratorForOrthography, state_path: Path):
+    """Writes a state file in the format chosen by `encode_snapshot`."""
+    write_atomically(state_path, encode_snapshot(generator, state_path))
+
+
+def load_state(state_path: Path) -> QuestionGeneratorForOrthography:
+    """Loads the snapshot and applies the answers from its journal, if there is one."""
+    generator = load_snapshot(state_path)
+    replay_journal(generator, journal_path(state_path))
+    return generator
+
+
+def save_state(
+    generator: QuestionGeneratorForOrthography,
+    state_path: Path,
+    background_writer: Optional[BackgroundWriter] = None,
+):
+    """Writes a full snapshot and drops the journal it supersedes.
+
+    With `background_writer`, both happen later on its worker thread (see
+    `BackgroundWriter.save_snapshot`).
+    """
+    drop_journal = functools.partial(journal_path(state_path).unlink, missing_ok=True)
+    if background_writer is not None:
+        background_writer.save_snapshot(
+            state_path,
+            generator.clone,
+            functools.partial(encode_snapshot, state_path=state_path),
+            then=drop_journal,
+        )
+        return
+    save_snapshot(generator, state_path)
+    drop_journal()
+
+
+def convert_state(source_path: Path, target_path: Path):
+    """Converts between the JSON and binary state formats (see `save_snapshot`)."""
+    save_snapshot(load_state(source_path), target_path)
+
+
+def _read_journal(path: Path, start: int = 0) -> Iterator[tuple[int, int, str, bool]]:
+    """Yields `(end_offset, epoch, problem_ID, correct)` of every complete record
+    from byte offset `start` on.
+
+    Reading stops at the first torn record, i.e. one that was cut short by a crash
+    (or is still being written).
+    """
+    offset = start
+    with open(path, "rb") as file:
+        file.seek(start)
+        for line in file:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                epoch, problem_ID, correct = json.loads(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield offset, int(epoch), str(problem_ID), bool(correct)
+
+
+def replay_journal(
+    generator: QuestionGeneratorForOrthography, path: Path, start: int = 0
+) -> int:
+    """Applies the journal records newer than the snapshot to `generator`.
+
+    Records from before `generator.current_epoch` are already part of the snapshot
+    (a crash may happen between writing a snapshot and truncating its journal) and
+    are skipped. With `start`, only the records from that byte offset on are read.
+    Returns the byte length of the valid part of the journal.
+    """
+    if not path.is_file():
+        return 0
+    valid_length = start
+    for valid_length, epoch, problem_ID, correct in _read_journal(path, start):
+        if epoch < generator.current_epoch:
+            continue
+        q = generator.questions.get(problem_ID)
+        if q is None:
+            continue
+        generator.current_epoch = epoch
+        generator.update_question(q.question, correct)
+    return valid_length
+
+
+class StateJournal:
+    """Journaled persistence of a quiz state.
+
+    The state lives in a snapshot file (the regular JSON state) and an append-only
+    journal with one `[epoch, problem_ID, correct]` line per answer. Recording an
+    answer costs one short append, independent of the bank size. Every
+    `compact_every` answers, and on `close`, the journal is folded into a fresh
+    snapshot.
+
+    With `background_writer`, the appends and compactions run on its worker
+    thread. A compaction snapshot is serialized when the worker gets to it, so it
+    can already contain answers whose records are appended after it; the replay
+    skips those as older than the snapshot.
+    """
+
+    def __init__(
+        self,
+        state_path: Path,
+        compact_every: int = 500,
+        background_writer: Optional[BackgroundWriter] = None,
+    ):
+        self.state_path = state_path
+        self.journal_path = journal_path(state_path)
+        self.compact_every = compact_every
+        self.background_writer = background_writer
+        self._file: Optional[IO[str]] = None
+        self._records_since_compaction = 0
+
+    def open(self) -> QuestionGeneratorForOrthography:
+        """Loads the state, replays the journal and opens it for appending."""
+        generator = load_snapshot(self.state_path)
+        valid_length = replay_journal(generator, self.journal_path)
+        if self.journal_path.is_file():
+            # Drop a torn tail left by a crash, so new records start on a clean line.
+            os.truncate(self.journal_path, valid_length)
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        return generator
+
+    @profiled("journal.record")
+    def record(
+        self,
+        generator: QuestionGeneratorForOrthography,
+        epoch: int,
+        problem_ID: str,
+        correct: bool,
+    ):
+        """Appends one answer, compacting the journal when it has grown long enough."""
+        file = self._file
+        assert file is not None, "The journal is not open"
+        line = json.dumps([epoch, problem_ID, correct]) + "\n"
+        if self.background_writer is not None:
+            self.background_writer.submit(functools.partial(self._append, file, line))
+        else:
+            self._append(file, line)
+        self._records_since_compaction += 1
+        if self._records_since_compaction >= self.compact_every:
+            self.compact(generator)
+
+    @staticmethod
+    def _append(file: IO[str], line: str):
+        file.write(line)
+        file.flush()
+
+    @staticmethod
+    def _truncate(file: Optional[IO[str]]):
+        if file is not None:
+            file.truncate(0)
+            file.flush()
+
+    def compact(self, generator: QuestionGeneratorForOrthography):
+        """Writes a new snapshot and empties the journal."""
+        truncate = functools.partial(self._truncate, self._file)
+        if self.background_writer is not None:
+            self.background_writer.save_snapshot(
+                self.state_path,
+                generator.clone,
+                functools.partial(encode_snapshot, state_path=self.state_path),
+                then=truncate,
+            )
+        else:
+            save_snapshot(generator, self.state_path)
+            truncate()
+        self._records_since_compaction = 0
+
+    def close(self, generator: QuestionGeneratorForOrthography):
+        self.compact(generator)
+        file, self._file = self._file, None
+        if file is not None:
+            if self.background_writer is not None:
+                self.background_writer.submit(file.close)
+            else:
+                file.close()
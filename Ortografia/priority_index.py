@@ -0,0 +1,316 @@
+# Incremental ordering of the questions by their selection utility.
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Callable, Iterator, Optional, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .question_selection import ScoreArrays
+
+
+class IndexedHeap:
+    """Binary min-heap of `(key, row)` entries that can remove or re-key a row in O(log n)."""
+
+    def __init__(self):
+        self._keys: list[float] = []
+        self._rows: list[int] = []
+        self._pos: dict[int, int] = {}  # row -> position in the heap
+
+    @staticmethod
+    def from_arrays(rows: np.ndarray, keys: np.ndarray) -> IndexedHeap:
+        """Builds the heap in one go; a sorted array is a valid heap."""
+        order = np.lexsort((rows, keys))
+        ans = IndexedHeap()
+        ans._keys = keys[order].tolist()
+        ans._rows = rows[order].tolist()
+        ans._pos = {row: pos for pos, row in enumerate(ans._rows)}
+        return ans
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, row: int) -> bool:
+        return row in self._pos
+
+    def rows(self) -> list[int]:
+        return list(self._rows)
+
+    def key(self, row: int) -> float:
+        return self._keys[self._pos[row]]
+
+    def row_at(self, position: int) -> int:
+        """The row at `position` (0 <= position < len) of the heap's storage."""
+        return self._rows[position]
+
+    def ascending(self) -> Iterator[tuple[float, int]]:
+        """Yields the `(key, row)` entries in ascending order, lazily.
+
+        Taking the first `k` entries costs O(k log k), independent of the size of
+        the heap; the heap must not change while the iterator is in use.
+        """
+        frontier = [(self._keys[0], self._rows[0], 0)] if self._rows else []
+        while frontier:
+            key, row, pos = heapq.heappop(frontier)
+            yield key, row
+            for child in (2 * pos + 1, 2 * pos + 2):
+                if child < len(self._rows):
+                    heapq.heappush(
+                        frontier, (self._keys[child], self._rows[child], child)
+                    )
+
+    def peek(self) -> Optional[tuple[float, int]]:
+        if not self._rows:
+            return None
+        return self._keys[0], self._rows[0]
+
+    def push(self, row: int, key: float):
+        assert row not in self._pos
+        self._keys.append(key)
+        self._rows.append(row)
+        self._pos[row] = len(self._rows) - 1
+        self._sift_up(len(self._rows) - 1)
+
+    def remove(self, row: int):
+        pos = self._pos.pop(row)
+        last_key = self._keys.pop()
+        last_row = self._rows.pop()
+        if pos == len(self._rows):
+            return
+        self._keys[pos] = last_key
+        self._rows[pos] = last_row
+        self._pos[last_row] = pos
+        self._sift_up(pos)
+        self._sift_down(self._pos[last_row])
+
+    def _less(self, i: int, j: int) -> bool:
+        # Ties are resolved by row, i.e. by the order in which questions were added.
+        return (self._keys[i], self._rows[i]) < (self._keys[j], self._rows[j])
+
+    def _swap(self, i: int, j: int):
+        self._keys[i], self._keys[j] = self._keys[j], self._keys[i]
+        self._rows[i], self._rows[j] = self._rows[j], self._rows[i]
+        self._pos[self._rows[i]] = i
+        self._pos[self._rows[j]] = j
+
+    def _sift_up(self, pos: int):
+        while pos > 0:
+            parent = (pos - 1) // 2
+            if not self._less(pos, parent):
+                break
+            self._swap(pos, parent)
+            pos = parent
+
+    def _sift_down(self, pos: int):
+        count = len(self._rows)
+        while True:
+            smallest = pos
+            for child in (2 * pos + 1, 2 * pos + 2):
+                if child < count and self._less(child, smallest):
+                    smallest = child
+            if smallest == pos:
+                break
+            self._swap(pos, smallest)
+            pos = smallest
+
+
+STABLE = -1  # `last_epoch` of the groups whose decay has vanished.
+BOUND_SLACK = 1e-9  # Rounding margin of `_Group.bound` as a lower bound.
+
+
+class _Group:
+    """Questions with the same counters and, while it matters, the same `last_epoch`.
+
+    All members have the same distribution of the salted utility. `members` is
+    keyed by row, so its top is the member that wins a tie.
+    """
+
+    def __init__(self, correct: int, incorrect: int, last_epoch: int, bound: float):
+        self.correct = correct
+        self.incorrect = incorrect
+        self.last_epoch = last_epoch
+        self.bound = bound
+        self.members = IndexedHeap()
+
+
+class PriorityIndex:
+    """Finds the question with the lowest salted utility of
+    `QuestionGenerator.get_utilities` without scoring the whole bank.
+
+    The utility of a question is `decay + median * (1 - decay)`, where the median
+    is the beta quantile at a CI jittered by a uniform salt in
+    `[-salt_amplitude, salt_amplitude]`, drawn for every question on every
+    selection. The decay `exp(-age * decay_factor)` vanishes below floating-point
+    resolution once a question has not been asked for `window` epochs.
+
+    The questions are grouped by their counters and, if asked within the last
+    `window` epochs, their `last_epoch`; all members of a group share the
+    distribution of the utility. The groups sit in one heap keyed by a lower
+    bound of their utility, the median at the smallest salt. `best` walks that
+    heap from its top and, for every group it reaches, draws the smallest of the
+    salts of its members in one go; it stops at the first bound above the best
+    utility so far, because no group further down can beat it. The winner is the
+    same as when salting every question, at the cost of the few groups near the
+    top. An answer moves one row between groups in O(log n).
+
+    `quantile(correct, incorrect, salt)` is the median at the salted CI and must
+    not decrease with `salt`. Without salt, ties are resolved by row, like in
+    `QuestionGenerator.get_worst_rows`.
+    """
+
+    def __init__(
+        self,
+        scores: ScoreArrays,
+        current_epoch: int,
+        quantile: Callable[[int, int, float], float],
+        salt_amplitude: float,
+        decay_factor: float,
+        window: int = 128,
+    ):
+        self.scores = scores
+        self._quantile = quantile
+        self._salt_amplitude = salt_amplitude
+        self._decay_factor = decay_factor
+        self._window = window
+        self._groups: dict[tuple[int, int, int], int] = {}  # Key -> group ID.
+        self._by_id: dict[int, _Group] = {}
+        self._next_id = 0
+        self._bounds = IndexedHeap()  # Group IDs by `_Group.bound`.
+        self._group_of: list[int] = []  # Row -> group ID.
+        # `last_epoch` -> IDs of the groups that have not expired yet, and a heap
+        # of those epochs.
+        self._recent: dict[int, list[int]] = {}
+        self._recent_epochs: list[int] = []
+
+        correct, incorrect = scores.correct, scores.incorrect
+        group_epoch = np.where(
+            current_epoch - scores.last_epoch >= window, STABLE, scores.last_epoch
+        )
+        # Rows sorted by group, and by row within each group.
+        rows = np.lexsort((group_epoch, incorrect, correct))
+        columns = (correct[rows], incorrect[rows], group_epoch[rows])
+        new_group = np.ones(len(rows), dtype=bool)
+        new_group[1:] = np.diff(np.stack(columns), axis=1).any(axis=0)
+        starts = np.flatnonzero(new_group).tolist()
+        ends = starts[1:] + [len(rows)]
+        group_IDs = []
+        for start, end in zip(starts, ends):
+            key = [int(column[start]) for column in columns]
+            group_ID = self._new_group(*key)
+            members = rows[start:end]
+            self._by_id[group_ID].members = IndexedHeap.from_arrays(
+                members, members.astype(float)
+            )
+            group_IDs.append(group_ID)
+        group_of = np.empty(len(rows), dtype=np.int64)
+        group_of[rows] = np.repeat(
+            np.asarray(group_IDs, dtype=np.int64), np.diff([*starts, len(rows)])
+        )
+        self._group_of = group_of.tolist()
+
+    def __len__(self) -> int:
+        return len(self._group_of)
+
+    def _new_group(self, correct: int, incorrect: int, last_epoch: int) -> int:
+        group_ID, self._next_id = self._next_id, self._next_id + 1
+        bound = self._quantile(correct, incorrect, -self._salt_amplitude)
+        self._groups[correct, incorrect, last_epoch] = group_ID
+        self._by_id[group_ID] = _Group(correct, incorrect, last_epoch, bound)
+        self._bounds.push(group_ID, bound)
+        if last_epoch != STABLE:
+            if last_epoch not in self._recent:
+                self._recent[last_epoch] = []
+                heapq.heappush(self._recent_epochs, last_epoch)
+            self._recent[last_epoch].append(group_ID)
+        return group_ID
+
+    def _group(self, correct: int, incorrect: int, last_epoch: int) -> int:
+        group_ID = self._groups.get((correct, incorrect, last_epoch))
+        if group_ID is None:
+            group_ID = self._new_group(correct, incorrect, last_epoch)
+        return group_ID
+
+    def _drop_group(self, group_ID: int):
+        group = self._by_id.pop(group_ID)
+        del self._groups[group.correct, group.incorrect, group.last_epoch]
+        self._bounds.remove(group_ID)
+
+    def _insert(self, row: int, current_epoch: int):
+        scores = self.scores
+        last_epoch = int(scores.last_epoch[row])
+        if current_epoch - last_epoch >= self._window:
+            last_epoch = STABLE
+        group_ID = self._group(
+            int(scores.correct[row]), int(scores.incorrect[row]), last_epoch
+        )
+        self._by_id[group_ID].members.push(row, row)
+        self._group_of[row] = group_ID
+
+    def add(self, row: int, current_epoch: int):
+        """Registers a newly appended row of `scores`."""
+        self._group_of.append(-1)
+        self._insert(row, current_epoch)
+
+    def update(self, row: int, current_epoch: int):
+        """Moves `row` to its group after its counters in `scores` have changed."""
+        group_ID = self._group_of[row]
+        members = self._by_id[group_ID].members
+        members.remove(row)
+        if len(members) == 0:
+            self._drop_group(group_ID)
+        self._insert(row, current_epoch)
+
+    def _expire(self, current_epoch: int):
+        """Merges the groups of questions last asked `window` epochs ago or earlier
+        into the stable groups with the same counters."""
+        recent_epochs = self._recent_epochs
+        while recent_epochs and current_epoch - recent_epochs[0] >= self._window:
+            for group_ID in self._recent.pop(heapq.heappop(recent_epochs)):
+                group = self._by_id.get(group_ID)
+                if group is None:
+                    continue  # Emptied by answers before it expired.
+                self._drop_group(group_ID)
+                stable_ID = self._group(group.correct, group.incorrect, STABLE)
+                stable = self._by_id[stable_ID]
+                moved = group.members
+                if len(moved) > len(stable.members):
+                    moved, stable.members = stable.members, moved
+                for row in moved.rows():
+                    stable.members.push(row, row)
+                for row in group.members.rows():
+                    self._group_of[row] = stable_ID
+
+    def _utility(self, group: _Group, current_epoch: int) -> tuple[float, int]:
+        """Draws the lowest salted utility among the members of `group`, and its row."""
+        members = group.members
+        if self._salt_amplitude:
+            # The smallest of len(members) uniform salts, via its inverse CDF; the
+            # member that drew it is uniformly distributed.
+            salt = self._salt_amplitude - 2 * self._salt_amplitude * (
+                np.random.random() ** (1 / len(members))
+            )
+            row = members.row_at(np.random.randint(len(members)))
+        else:
+            salt = 0.0
+            row = members.row_at(0)
+        median = self._quantile(group.correct, group.incorrect, salt)
+        if group.last_epoch == STABLE:
+            return median, row
+        exponential_decay = math.exp(
+            -(current_epoch - group.last_epoch) * self._decay_factor
+        )
+        return exponential_decay + median * (1 - exponential_decay), row
+
+    def best(self, current_epoch: int) -> Optional[int]:
+        """Returns the row with the lowest (salted) utility at `current_epoch`."""
+        self._expire(current_epoch)
+        best: Optional[tuple[float, int]] = None
+        for bound, group_ID in self._bounds.ascending():
+            if best is not None and bound > best[0] + BOUND_SLACK:
+                break
+            candidate = self._utility(self._by_id[group_ID], current_epoch)
+            if best is None or candidate < best:
+                best = candidate
+        return None if best is None else best[1]
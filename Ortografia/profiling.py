@@ -0,0 +1,192 @@
+# Lightweight timing of the quiz's hot paths. Off by default; enabled by
+# `ortografia --profile` or the `PROFILE_ENV` environment variable, in which case
+# a summary is printed (and optionally saved as JSON) at exit.
+from __future__ import annotations
+
+import atexit
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional, ParamSpec, TypeVar
+
+from rich.console import Console
+from rich.table import Table
+
+PROFILE_ENV = "ORTOGRAFIA_PROFILE"  # Any value but "" or "0" enables profiling.
+PROFILE_JSON_ENV = "ORTOGRAFIA_PROFILE_JSON"  # Where to save the JSON summary.
+
+# Upper bounds of the histogram buckets, in seconds: 1µs, 2µs, 4µs, ... ~67s.
+BUCKET_BOUNDS = tuple(1e-6 * 2**k for k in range(27))
+PERCENTILES = (50, 90, 99)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_enabled = False
+_lock = threading.Lock()
+_report_registered = False
+_json_path: Optional[Path] = None
+
+
+class PhaseStats:
+    """Call count, total and extreme durations, and a log2 histogram of one phase."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket that holds the given percentile, in seconds."""
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+            "min_us": self.min * 1e6 if self.count else 0.0,
+            "max_us": self.max * 1e6,
+            **{f"p{p}_us": self.percentile(p) * 1e6 for p in PERCENTILES},
+            # Histogram as {upper bound in µs: count}, without the empty buckets.
+            "histogram_us": {
+                (f"{bound * 1e6:g}" if i < len(BUCKET_BOUNDS) else "inf"): count
+                for i, (bound, count) in enumerate(
+                    zip(BUCKET_BOUNDS + (float("inf"),), self.buckets)
+                )
+                if count
+            },
+        }
+
+
+_phases: dict[str, PhaseStats] = {}
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def record(phase: str, seconds: float):
+    with _lock:
+        stats = _phases.get(phase)
+        if stats is None:
+            stats = _phases[phase] = PhaseStats()
+        stats.add(seconds)
+
+
+def profiled(phase: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator that records the duration of every call under `phase`.
+
+    While profiling is disabled, the wrapper only checks a flag.
+    """
+
+    def decorate(function: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(phase, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorate
+
+
+@contextlib.contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Records the duration of the `with` block under `phase`."""
+    if not _enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - started)
+
+
+def summary() -> dict[str, dict]:
+    """The statistics of every phase, by phase name."""
+    with _lock:
+        return {phase: _phases[phase].to_dict() for phase in sorted(_phases)}
+
+
+def summary_table() -> Table:
+    """The summary; the percentiles are the upper bounds of their histogram buckets."""
+    table = Table(title="Profile (µs)")
+    table.add_column("Phase")
+    table.add_column("Calls", justify="right")
+    for column in ["Total", "Mean", *(f"p{p}" for p in PERCENTILES), "Max"]:
+        table.add_column(column, justify="right")
+    for phase, stats in summary().items():
+        table.add_row(
+            phase,
+            f"{stats['count']:,}",
+            f"{stats['total_s'] * 1e6:,.0f}",
+            f"{stats['mean_us']:,.1f}",
+            *(f"{stats[f'p{p}_us']:,.0f}" for p in PERCENTILES),
+            f"{stats['max_us']:,.0f}",
+        )
+    return table
+
+
+def dump_json(path: Path):
+    path.write_text(json.dumps(summary(), indent=2) + "\n", encoding="utf-8")
+
+
+def reset():
+    with _lock:
+        _phases.clear()
+
+
+def _report():
+    if _json_path is not None:
+        dump_json(_json_path)
+    if _phases:
+        Console(stderr=True).print(summary_table())
+
+
+def enable(report_at_exit: bool = True, json_path: Optional[Path] = None):
+    """Starts recording; with `report_at_exit`, prints the summary table to stderr
+    at interpreter exit and saves it to `json_path`, if given."""
+    global _enabled, _report_registered, _json_path
+    _enabled = True
+    if json_path is not None:
+        _json_path = json_path
+    if report_at_exit and not _report_registered:
+        atexit.register(_report)
+        _report_registered = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+if os.environ.get(PROFILE_ENV, "") not in ("", "0"):
+    _json = os.environ.get(PROFILE_JSON_ENV)
+    enable(json_path=Path(_json) if _json else None)
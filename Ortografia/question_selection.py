@@ -1,15 +1,36 @@
 from __future__ import annotations
 
-import heapq
 import random
+from typing import Mapping, MutableMapping, Optional
 
 import numpy as np
 from pydantic import BaseModel
 
-from .beta_scoring_function import question_score
+from .beta_scoring_function import (
+    exact_quantile_table,
+    interpolated_quantile_table,
+    question_score,
+)
 from .ifaces import I_Problem
+from .priority_index import PriorityIndex
+from .profiling import profiled
 from rich.text import Text
 
+SELECTION_CI = 0.2  # Quantile of the beta posterior used to rank the questions.
+SALT_AMPLITUDE = 0.05  # Half-width of the random jitter added to SELECTION_CI.
+DECAY_FACTOR = (
+    0.4  # The smaller, the bigger the delay before repeating the same question.
+)
+
+# Memoized beta quantiles: the exact ones back the correctness score, the
+# interpolated ones cover every CI the selection salt can produce.
+CORRECTNESS_QUANTILES = exact_quantile_table(SELECTION_CI)
+SELECTION_QUANTILES = interpolated_quantile_table(
+    SELECTION_CI - SALT_AMPLITUDE, SELECTION_CI + SALT_AMPLITUDE
+)
+
+SCORE_RECOMPUTE_INTERVAL = 10000  # Updates between full recomputes of the score sum.
+
 
 class QuestionWithScore(BaseModel):
     question: I_Problem
@@ -25,11 +46,7 @@ class QuestionWithScore(BaseModel):
         self.last_epoch = current_epoch
 
     def get_correctness_score(self) -> float:
-        return question_score(
-            positive_reviews_count=self.correct_count,
-            total_reviews_count=self.correct_count + self.incorrect_count,
-            CI=0.2,
-        )
+        return CORRECTNESS_QUANTILES.quantile(self.correct_count, self.incorrect_count)
 
     def get_score_for_selection(self, current_epoch: int, add_salt: bool) -> float:
         """Returns score that is used for problem selection.
@@ -38,21 +55,18 @@ class QuestionWithScore(BaseModel):
         disfavours problems that have been asked recently.
         """
         if add_salt:
-            random_salt = random.uniform(-0.05, 0.05)
+            random_salt = random.uniform(-SALT_AMPLITUDE, SALT_AMPLITUDE)
         else:
             random_salt = 0
 
         beta_median = question_score(
             positive_reviews_count=self.correct_count,
             total_reviews_count=self.correct_count + self.incorrect_count,
-            CI=0.2 + random_salt,
-        )
-        decay_factor = (
-            0.4  # The smaller, the bigger the delay before repeating the same question.
+            CI=SELECTION_CI + random_salt,
         )
         question_age = current_epoch - self.last_epoch
 
-        exponential_decay = np.exp(-(question_age * decay_factor))
+        exponential_decay = np.exp(-(question_age * DECAY_FACTOR))
         return 1 * exponential_decay + beta_median * (1 - exponential_decay)
 
     def rich_repr(self) -> Text:
@@ -74,71 +88,300 @@ class QuestionWithScore(BaseModel):
         return ans
 
 
+class ScoreArrays:
+    """Struct-of-arrays copy of the per-question counters.
+
+    Row `i` holds the counters of the question `ids[i]`; rows are kept in the
+    order in which the questions were added. The arrays grow geometrically, so
+    appending a question is amortized O(1).
+
+    The sum of the correctness scores of all rows is maintained incrementally,
+    and recomputed from scratch every `SCORE_RECOMPUTE_INTERVAL` updates to keep
+    the floating-point drift in check.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self._correct = np.zeros(capacity, dtype=np.int64)
+        self._incorrect = np.zeros(capacity, dtype=np.int64)
+        self._last_epoch = np.zeros(capacity, dtype=np.int64)
+        self._correctness_sum = 0.0
+        self._updates_since_recompute = 0
+
+    @staticmethod
+    def from_questions(questions: Mapping[str, QuestionWithScore]) -> ScoreArrays:
+        ans = ScoreArrays(capacity=0)
+        ans.ids = list(questions.keys())
+        ans.index = {problem_ID: row for row, problem_ID in enumerate(ans.ids)}
+        values = list(questions.values())
+        ans._correct = np.array([q.correct_count for q in values], dtype=np.int64)
+        ans._incorrect = np.array([q.incorrect_count for q in values], dtype=np.int64)
+        ans._last_epoch = np.array([q.last_epoch for q in values], dtype=np.int64)
+        ans.recompute_correctness_sum()
+        return ans
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def correct(self) -> np.ndarray:
+        return self._correct[: len(self.ids)]
+
+    @property
+    def incorrect(self) -> np.ndarray:
+        return self._incorrect[: len(self.ids)]
+
+    @property
+    def last_epoch(self) -> np.ndarray:
+        return self._last_epoch[: len(self.ids)]
+
+    def append(
+        self, problem_ID: str, correct_count: int, incorrect_count: int, last_epoch: int
+    ) -> int:
+        row = len(self.ids)
+        if row == len(self._correct):
+            capacity = max(2 * row, 64)
+            self._correct = np.resize(self._correct, capacity)
+            self._incorrect = np.resize(self._incorrect, capacity)
+            self._last_epoch = np.resize(self._last_epoch, capacity)
+        self._correct[row] = correct_count
+        self._incorrect[row] = incorrect_count
+        self._last_epoch[row] = last_epoch
+        self.ids.append(problem_ID)
+        self.index[problem_ID] = row
+        self._correctness_sum += CORRECTNESS_QUANTILES.quantile(
+            correct_count, incorrect_count
+        )
+        return row
+
+    def correctness_score(self, row: int) -> float:
+        return CORRECTNESS_QUANTILES.quantile(
+            int(self._correct[row]), int(self._incorrect[row])
+        )
+
+    def update_score(self, row: int, correct: bool, current_epoch: int):
+        old_score = self.correctness_score(row)
+        if correct:
+            self._correct[row] += 1
+        else:
+            self._incorrect[row] += 1
+        self._last_epoch[row] = current_epoch
+        self._correctness_sum += self.correctness_score(row) - old_score
+        self._updates_since_recompute += 1
+        if self._updates_since_recompute >= SCORE_RECOMPUTE_INTERVAL:
+            self.recompute_correctness_sum()
+
+    def apply_answers(self, rows: np.ndarray, correct: np.ndarray, epochs: np.ndarray):
+        """`update_score` for many answers at once, given in the order they were given.
+
+        The counters grow by the number of answers per row and `last_epoch` takes
+        the epoch of the last answer to each row.
+        """
+        n = len(self.ids)
+        self._correct[:n] += np.bincount(rows[correct], minlength=n)
+        self._incorrect[:n] += np.bincount(rows[~correct], minlength=n)
+        answered, last = np.unique(rows[::-1], return_index=True)
+        self._last_epoch[answered] = epochs[::-1][last]
+        self.recompute_correctness_sum()
+
+    @property
+    def correctness_sum(self) -> float:
+        """Sum of `QuestionWithScore.get_correctness_score` over all rows, in O(1)."""
+        return self._correctness_sum
+
+    def recompute_correctness_sum(self):
+        self._correctness_sum = float(
+            CORRECTNESS_QUANTILES.quantiles(self.correct, self.incorrect).sum()
+        )
+        self._updates_since_recompute = 0
+
+    def copy(self) -> ScoreArrays:
+        ans = ScoreArrays(capacity=0)
+        ans.ids = list(self.ids)
+        ans.index = dict(self.index)
+        ans._correct = self._correct.copy()
+        ans._incorrect = self._incorrect.copy()
+        ans._last_epoch = self._last_epoch.copy()
+        ans._correctness_sum = self._correctness_sum
+        ans._updates_since_recompute = self._updates_since_recompute
+        return ans
+
+
+class QuestionStore(MutableMapping[str, QuestionWithScore]):
+    """Base of question containers that keep the counters in their own `ScoreArrays`.
+
+    A generator whose `questions` is a `QuestionStore` uses `scores` directly
+    instead of mirroring the counters of a plain dict.
+    """
+
+    scores: ScoreArrays
+
+
+def get_medians(scores: ScoreArrays, rows: np.ndarray, add_salt: bool) -> np.ndarray:
+    """Beta medians of the given rows used for selection, optionally with a salted CI."""
+    if not add_salt:
+        return CORRECTNESS_QUANTILES.quantiles(
+            scores.correct[rows], scores.incorrect[rows]
+        )
+    CI = SELECTION_CI + np.random.uniform(
+        -SALT_AMPLITUDE, SALT_AMPLITUDE, size=len(rows)
+    )
+    return SELECTION_QUANTILES.quantiles(
+        scores.correct[rows], scores.incorrect[rows], CI
+    )
+
+
 class QuestionGenerator(BaseModel):
     questions: dict[str, QuestionWithScore] = {}
     current_epoch: int = 0
+    _scores: Optional[ScoreArrays] = None
+    _priority: Optional[PriorityIndex] = None
 
     def add_question(
         self, question: I_Problem, correct_count: int = 0, incorrect_count: int = 0
     ):
         assert question.problem_ID not in self.questions
+        scores = self._score_arrays()
         self.questions[question.problem_ID] = QuestionWithScore(
             question=question,
             correct_count=correct_count,
             incorrect_count=incorrect_count,
             last_epoch=0,
         )
+        row = scores.index.get(question.problem_ID)
+        if row is None:  # A `QuestionStore` has already appended the counters.
+            row = scores.append(question.problem_ID, correct_count, incorrect_count, 0)
+        self._row_added(row)
 
+    def _row_added(self, row: int):
+        """Registers a row just appended to the score arrays with the priority index."""
+        if self._priority is not None and self._priority.scores is self._score_arrays():
+            self._priority.add(row, self.current_epoch)
+
+    @profiled("select")
     def get_question(self) -> I_Problem:
         return self.worst_question.question
 
+    @profiled("update")
     def update_question(self, question: I_Problem, correct: bool):
         q = self.questions[question.problem_ID]
+        scores = self._score_arrays()
         q.update_score(correct, self.current_epoch)
+        row = scores.index[question.problem_ID]
+        scores.update_score(row, correct, self.current_epoch)
+        if self._priority is not None and self._priority.scores is scores:
+            self._priority.update(row, self.current_epoch)
         self.current_epoch += 1
 
+    def apply_answers(self, rows: np.ndarray, correct: np.ndarray, epochs: np.ndarray):
+        """Bulk `update_question`: `rows[i]` (a `ScoreArrays` row) was answered
+        `correct[i]` at epoch `epochs[i]`, in this order.
+
+        Same result as setting `current_epoch` to each epoch and calling
+        `update_question`, but vectorized over all answers.
+        """
+        if len(rows) == 0:
+            return
+        scores = self._score_arrays()
+        scores.apply_answers(rows, correct, epochs)
+        if not isinstance(self.questions, QuestionStore):
+            for row in np.unique(rows).tolist():
+                q = self.questions[scores.ids[row]]
+                q.correct_count = int(scores.correct[row])
+                q.incorrect_count = int(scores.incorrect[row])
+                q.last_epoch = int(scores.last_epoch[row])
+        self.current_epoch = int(epochs[-1]) + 1
+        self._priority = None  # Rebuilt from the new counters when needed.
+
+    def _score_arrays(self) -> ScoreArrays:
+        """Returns the counters of all questions as contiguous arrays.
+
+        The arrays are built lazily from `questions` (e.g. after loading the state)
+        and then kept in sync by `add_question` and `update_question`.
+        """
+        if isinstance(self.questions, QuestionStore):
+            return self.questions.scores
+        if self._scores is None or len(self._scores) != len(self.questions):
+            self._scores = ScoreArrays.from_questions(self.questions)
+        return self._scores
+
+    def _priority_index(self) -> PriorityIndex:
+        """Returns the incremental index behind `worst_question`, building it if needed."""
+        scores = self._score_arrays()
+        if self._priority is None or self._priority.scores is not scores:
+            self._priority = PriorityIndex(
+                scores,
+                self.current_epoch,
+                quantile=lambda correct, incorrect, salt: SELECTION_QUANTILES.quantile(
+                    correct, incorrect, SELECTION_CI + salt
+                ),
+                salt_amplitude=SALT_AMPLITUDE,
+                decay_factor=DECAY_FACTOR,
+            )
+        return self._priority
+
+    def get_utilities(self, add_salt: bool, add_decay: bool) -> np.ndarray:
+        """Returns the selection utility of every question, in `ScoreArrays` row order.
+
+        This is the batched equivalent of `QuestionWithScore.get_score_for_selection`
+        (when `add_decay`) or `QuestionWithScore.get_correctness_score` (otherwise).
+        """
+        scores = self._score_arrays()
+        if not add_decay:
+            return CORRECTNESS_QUANTILES.quantiles(scores.correct, scores.incorrect)
+
+        beta_median = get_medians(scores, np.arange(len(scores)), add_salt)
+        question_age = self.current_epoch - scores.last_epoch
+        exponential_decay = np.exp(-(question_age * DECAY_FACTOR))
+        return exponential_decay + beta_median * (1 - exponential_decay)
+
+    @profiled("select.worst")
     def get_worst_questions(
         self, max_count: int, add_salt: bool, add_decay: bool
     ) -> list[QuestionWithScore]:
-        class Q(BaseModel):
-            question: QuestionWithScore
-            utility: float
-
-            def __lt__(self, other: Q):
-                return self.utility < other.utility
-
-        questions: list[Q] = []
-        for q in self.questions.values():
-            if add_decay:
-                utility = q.get_score_for_selection(
-                    self.current_epoch, add_salt=add_salt
-                )
-            else:
-                utility = q.get_correctness_score()
-            heapq.heappush(questions, Q(question=q, utility=utility))
-        ans = []
-        max_count = min(max_count, len(questions))
-        for i in range(max_count):
-            ans.append(heapq.heappop(questions).question)
+        ids = self._score_arrays().ids
+        return [
+            self.questions[ids[row]]
+            for row in self.get_worst_rows(max_count, add_salt, add_decay).tolist()
+        ]
 
-        return ans
+    def get_worst_rows(
+        self, max_count: int, add_salt: bool, add_decay: bool
+    ) -> np.ndarray:
+        """`ScoreArrays` rows of the questions returned by `get_worst_questions`."""
+        scores = self._score_arrays()
+        max_count = min(max_count, len(scores))
+        if max_count <= 0:
+            return np.zeros(0, dtype=np.int64)
+        utilities = self.get_utilities(add_salt=add_salt, add_decay=add_decay)
+        if max_count < len(scores):
+            kth = np.partition(utilities, max_count - 1)[max_count - 1]
+            # Keep every tie of the k-th utility, so the cut below is deterministic.
+            rows = np.flatnonzero(utilities <= kth)
+        else:
+            rows = np.arange(len(scores))
+        # Ties are resolved by row, i.e. by the order in which questions were added.
+        return rows[np.lexsort((rows, utilities[rows]))][:max_count]
 
     @property
     def worst_question(self) -> QuestionWithScore:
-        worst_questions = self.get_worst_questions(1, add_salt=True, add_decay=True)
-        if len(worst_questions) == 0:
-            print("No questions")
+        """The question with the lowest salted selection utility.
 
-        return worst_questions[0]
+        Served from the incremental `PriorityIndex`, which salts only the few
+        questions that can win instead of rescanning the whole bank; the winner
+        has the same distribution as with `get_worst_questions(1, True, True)`.
+        """
+        row = self._priority_index().best(self.current_epoch)
+        if row is None:
+            raise IndexError("worst_question: the generator has no questions")
+
+        return self.questions[self._score_arrays().ids[row]]
 
+    @profiled("score")
     def get_score(self) -> float:
-        score_sum = 0.0
-        for q in self.questions.values():
-            score_sum += q.get_correctness_score()
-        score = (
-            score_sum / len(self) - 0.2
-        ) / 0.6  # Normalize score from 20 to 80 percent
-        return min(max(score, 0.0), 1.0)
+        score_sum = self._score_arrays().correctness_sum
+        return float(self._normalize_score(score_sum))
         # questions = self.get_worst_questions(
         #     max_count=self.score_depth, add_decay=False, add_salt=False
         # )
@@ -146,6 +389,47 @@ class QuestionGenerator(BaseModel):
         # scores = np.array([q.get_correctness_score() for q in questions])
         # return float(np.sum(weights * scores))
 
+    def _normalize_score(self, score_sum: float | np.ndarray) -> float | np.ndarray:
+        score = (
+            score_sum / len(self) - 0.2
+        ) / 0.6  # Normalize score from 20 to 80 percent
+        return np.clip(score, 0.0, 1.0)
+
+    def score_delta(self, question: I_Problem, correct: bool) -> float:
+        """Returns how `get_score` would change if `question` was answered now.
+
+        Computed in closed form from the counters of that one question, without
+        touching the rest of the bank.
+        """
+        return float(self.score_deltas(correct, [question.problem_ID])[0])
+
+    def score_deltas(
+        self, correct: bool, problem_IDs: list[str] | None = None
+    ) -> np.ndarray:
+        """Batched `score_delta` for the given questions (all of them by default).
+
+        Without `problem_IDs` the result is in `ScoreArrays` row order.
+        """
+        scores = self._score_arrays()
+        if problem_IDs is None:
+            rows = np.arange(len(scores))
+        else:
+            rows = np.array([scores.index[i] for i in problem_IDs], dtype=np.int64)
+        old_correct = scores.correct[rows]
+        old_incorrect = scores.incorrect[rows]
+        new_correct = old_correct + 1 if correct else old_correct
+        new_incorrect = old_incorrect if correct else old_incorrect + 1
+
+        score_sum = scores.correctness_sum
+        new_sum = (
+            score_sum
+            - CORRECTNESS_QUANTILES.quantiles(old_correct, old_incorrect)
+            + CORRECTNESS_QUANTILES.quantiles(new_correct, new_incorrect)
+        )
+        return np.asarray(
+            self._normalize_score(new_sum) - self._normalize_score(score_sum)
+        )
+
     def __len__(self) -> int:
         """Returns the number of questions in the generator."""
         return len(self.questions)
@@ -153,9 +437,8 @@ class QuestionGenerator(BaseModel):
     @property
     def answer_count(self) -> tuple[int, int]:
         """Returns the total number of answers given: positive and negative."""
-        total_correct = sum(q.correct_count for q in self.questions.values())
-        total_incorrect = sum(q.incorrect_count for q in self.questions.values())
-        return total_correct, total_incorrect
+        scores = self._score_arrays()
+        return int(scores.correct.sum()), int(scores.incorrect.sum())
 
     @property
     def score_depth(self) -> int:
@@ -171,7 +454,10 @@ class QuestionGenerator(BaseModel):
 
     def clone(self) -> QuestionGenerator:
         """Returns a clone of the current generator."""
-        return QuestionGenerator(
-            questions={k: v.copy() for k, v in self.questions.items()},
+        ans = QuestionGenerator(
+            questions={k: v.model_copy() for k, v in self.questions.items()},
             current_epoch=self.current_epoch,
         )
+        if self._scores is not None:
+            ans._scores = self._scores.copy()
+        return ans
@@ -0,0 +1,85 @@
+# Rebuilding the quiz state from the response log written by `ResponseLogger`.
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from .orthography_questions import QuestionGeneratorForOrthography
+from .response_log import READ_CHUNK_SIZE, read_responses
+
+REPLAY_CHUNK_SIZE = READ_CHUNK_SIZE
+
+
+class ReplayReport(BaseModel):
+    """Outcome of replaying a response log onto a question bank."""
+
+    rows: int = 0  # Responses read from the log.
+    applied: int = 0  # Responses applied to the bank.
+    skipped_old: int = 0  # Responses from before the epoch of the bank.
+    unknown_questions: int = 0  # Responses to questions that are not in the bank.
+
+
+def replay_log(
+    generator: QuestionGeneratorForOrthography,
+    log_file: Path,
+    chunk_size: int = REPLAY_CHUNK_SIZE,
+) -> ReplayReport:
+    """Applies the responses of a `ResponseLogger` log, including its rotated
+    segments, to `generator`.
+
+    The log is read in chunks of `chunk_size` rows and each chunk is applied at
+    once with `apply_answers`. As with the journal, responses from before
+    `generator.current_epoch` are taken to be part of the bank already and are
+    skipped, so a fresh bank gets all of them.
+    """
+    report = ReplayReport()
+    scores = generator.questions.scores
+    problem_IDs = pd.Index(scores.ids)
+    first_epoch = generator.current_epoch
+    for chunk in read_responses(log_file, chunk_size=chunk_size, with_timestamps=False):
+        report.rows += len(chunk)
+        epochs = chunk["epoch"].to_numpy()
+        new = epochs >= first_epoch
+        report.skipped_old += int(len(new) - new.sum())
+        rows = problem_IDs.get_indexer(chunk["question_id"])
+        known = new & (rows >= 0)
+        report.unknown_questions += int((new & (rows < 0)).sum())
+        report.applied += int(known.sum())
+        generator.apply_answers(
+            rows[known], chunk["is_correct"].to_numpy()[known], epochs[known]
+        )
+    return report
+
+
+def compare_states(
+    expected: QuestionGeneratorForOrthography,
+    actual: QuestionGeneratorForOrthography,
+) -> list[str]:
+    """Describes every difference between the epochs and counters of two banks.
+
+    Empty if they agree. Questions that are only in `actual` are not reported.
+    """
+    ans = []
+    if expected.current_epoch != actual.current_epoch:
+        ans.append(
+            f"current epoch: expected {expected.current_epoch}, "
+            f"got {actual.current_epoch}"
+        )
+    theirs, ours = expected.questions.scores, actual.questions.scores
+    rows = pd.Index(ours.ids).get_indexer(theirs.ids)
+    present = rows >= 0
+    ids = np.asarray(theirs.ids, dtype=object)
+    ans.extend(f"{problem_ID}: missing" for problem_ID in ids[~present].tolist())
+
+    wanted = np.stack([theirs.correct, theirs.incorrect, theirs.last_epoch], axis=1)
+    got = np.stack([ours.correct, ours.incorrect, ours.last_epoch], axis=1)
+    wanted, got, ids = wanted[present], got[rows[present]], ids[present]
+    for i in np.flatnonzero((wanted != got).any(axis=1)).tolist():
+        ans.append(
+            f"{ids[i]}: expected (ok, bad, last epoch) {tuple(wanted[i].tolist())}, "
+            f"got {tuple(got[i].tolist())}"
+        )
+    return ans
@@ -0,0 +1,246 @@
+# Reading the response log written by `ResponseLogger`, including the segments it
+# has rotated out: plain or gzipped CSV, or columnar NumPy segments (.npz).
+from __future__ import annotations
+
+import datetime
+import io
+from enum import Enum
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from .fileutil import write_atomically
+
+SEGMENT_SUFFIX = ".npz"
+READ_CHUNK_SIZE = 1_000_000
+QUARTER_HOUR_MS = 15 * 60 * 1000
+
+# Columns of the frames returned by `read_responses`.
+COLUMNS = ["epoch", "question_id", "is_correct", "timestamp_ms"]
+
+
+class ArchiveFormat(Enum):
+    """How `ResponseLogger` stores a rotated log file."""
+
+    GZIP = "gzip"  # The CSV file, gzipped.
+    COLUMNAR = "columnar"  # A columnar NumPy segment (see `write_segment`).
+
+
+def rotated_logs(log_file: Path) -> list[Path]:
+    """The rotated segments of `log_file`, oldest first.
+
+    They are named `<stem>.<rotation time><suffix>` followed by ".gz" or replaced
+    by `SEGMENT_SUFFIX`, so the names sort in rotation order.
+    """
+    names = {path.name for path in log_file.parent.glob(f"{log_file.stem}.*")}
+    names.discard(log_file.name)
+    ans = []
+    for name in sorted(names):
+        if name.endswith(log_file.suffix):
+            if name + ".gz" in names or (
+                name.removesuffix(log_file.suffix) + SEGMENT_SUFFIX in names
+            ):
+                continue  # Already archived; a crash kept the original.
+        elif not name.endswith((log_file.suffix + ".gz", SEGMENT_SUFFIX)):
+            continue
+        ans.append(log_file.parent / name)
+    return ans
+
+
+def rotated_log_path(log_file: Path, rotated_at: datetime.datetime) -> Path:
+    """Where `log_file` is moved when it is rotated at `rotated_at`."""
+    stamp = rotated_at.strftime("%Y%m%dT%H%M%S%f")
+    return log_file.with_name(f"{log_file.stem}.{stamp}{log_file.suffix}")
+
+
+def _utc_offset_ms(local_ms: int, fold: bool) -> int:
+    """UTC offset of a local time (as milliseconds since 1970-01-01 00:00), by the
+    system's time zone rules; `fold` selects the second of two ambiguous times."""
+    local = datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=local_ms)
+    return local_ms - round(local.replace(fold=int(fold)).timestamp() * 1000)
+
+
+def to_timestamp_ms(
+    isoformat: pd.Series, latest: Optional[np.datetime64] = None
+) -> tuple[np.ndarray, Optional[np.datetime64]]:
+    """Milliseconds since the Unix epoch of the local-time ISO strings of the log,
+    and the latest of those local times (for the `latest` of the next chunk).
+
+    The log is chronological, so a local time that is earlier than one before it
+    (or than `latest`, from the preceding chunks) was written after the clocks
+    fell back: such a time, if ambiguous, is taken as the second occurrence and
+    any other ambiguous time as the first. The UTC offset is looked up once per
+    quarter of an hour of local time, as time zones change on quarter hours.
+    """
+    local = pd.to_datetime(isoformat, format="ISO8601").to_numpy()
+    if len(local) == 0:
+        return np.zeros(0, dtype=np.int64), latest
+    running_max = np.maximum.accumulate(local)
+    if latest is not None:
+        running_max = np.maximum(running_max, latest)
+    local_ms = local.astype("datetime64[ms]").astype(np.int64)
+    keys = local_ms // QUARTER_HOUR_MS * 2 + (local < running_max)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    offsets = np.array(
+        [
+            _utc_offset_ms(key // 2 * QUARTER_HOUR_MS, bool(key % 2))
+            for key in unique_keys.tolist()
+        ],
+        dtype=np.int64,
+    )
+    return local_ms - offsets[inverse], running_max[-1]
+
+
+def _read_csv(
+    path: Path, chunk_size: int, with_timestamps: bool = True
+) -> Iterator[pd.DataFrame]:
+    usecols = ["epoch", "question_id", "is_correct"]
+    latest = None  # Local time of the last row so far, see `to_timestamp_ms`.
+    for chunk in pd.read_csv(
+        path,
+        usecols=usecols + ["datetime"] if with_timestamps else usecols,
+        dtype={"epoch": np.int64, "question_id": str, "is_correct": bool},
+        keep_default_na=False,
+        chunksize=chunk_size,
+    ):
+        if with_timestamps:
+            chunk["timestamp_ms"], latest = to_timestamp_ms(chunk["datetime"], latest)
+            yield chunk[COLUMNS]
+        else:
+            yield chunk[usecols]
+
+
+def write_segment(csv_path: Path, segment_path: Path) -> None:
+    """Converts a (possibly gzipped) CSV log into a columnar segment.
+
+    The segment stores the question IDs once, in the `question_ids` dictionary,
+    and per response the index into it (`question`), the `epoch`, the
+    `timestamp_ms` and the bit-packed `correct` flag. The `epochs` and
+    `timestamps_ms` members hold the [min, max] ranges, so readers can skip a
+    segment without loading its columns. The given answer is not kept: it
+    follows from the question and the correctness.
+    """
+    log = pd.concat(_read_csv(csv_path, READ_CHUNK_SIZE), ignore_index=True)
+    codes, question_ids = pd.factorize(log["question_id"])
+    epoch = log["epoch"].to_numpy(np.int64)
+    timestamp_ms = log["timestamp_ms"].to_numpy(np.int64)
+
+    def value_range(values: np.ndarray) -> np.ndarray:
+        if len(values) == 0:
+            return np.zeros(2, dtype=np.int64)
+        return np.array([values.min(), values.max()], dtype=np.int64)
+
+    segment = io.BytesIO()
+    np.savez_compressed(
+        segment,
+        question_ids=np.asarray(question_ids, dtype=str),
+        question=codes.astype(np.int32),
+        epoch=epoch,
+        timestamp_ms=timestamp_ms,
+        correct=np.packbits(log["is_correct"].to_numpy(bool)),
+        epochs=value_range(epoch),
+        timestamps_ms=value_range(timestamp_ms),
+    )
+    write_atomically(segment_path, segment.getvalue())
+
+
+def _read_segment(
+    path: Path,
+    question_ids: Optional[np.ndarray],
+    since_ms: Optional[int],
+    until_ms: Optional[int],
+) -> Optional[pd.DataFrame]:
+    """The matching responses of a segment; None if none match.
+
+    Only the small members are read for a segment that is skipped.
+    """
+    with np.load(path) as segment:
+        first_ms, last_ms = segment["timestamps_ms"].tolist()
+        if (since_ms is not None and last_ms < since_ms) or (
+            until_ms is not None and first_ms >= until_ms
+        ):
+            return None
+        dictionary = segment["question_ids"]
+        wanted_codes = None
+        if question_ids is not None:
+            wanted_codes = np.flatnonzero(np.isin(dictionary, question_ids))
+            if len(wanted_codes) == 0:
+                return None
+        codes = segment["question"]
+        epoch = segment["epoch"]
+        timestamp_ms = segment["timestamp_ms"]
+        correct = np.unpackbits(segment["correct"], count=len(codes)).astype(bool)
+
+    keep = np.ones(len(codes), dtype=bool)
+    if wanted_codes is not None:
+        keep &= np.isin(codes, wanted_codes)
+    if since_ms is not None:
+        keep &= timestamp_ms >= since_ms
+    if until_ms is not None:
+        keep &= timestamp_ms < until_ms
+    if not keep.any():
+        return None
+    return pd.DataFrame(
+        {
+            "epoch": epoch[keep],
+            "question_id": dictionary[codes[keep]].astype(object),
+            "is_correct": correct[keep],
+            "timestamp_ms": timestamp_ms[keep],
+        }
+    )
+
+
+def _filter(
+    chunk: pd.DataFrame,
+    question_ids: Optional[np.ndarray],
+    since_ms: Optional[int],
+    until_ms: Optional[int],
+) -> pd.DataFrame:
+    keep = np.ones(len(chunk), dtype=bool)
+    if question_ids is not None:
+        keep &= chunk["question_id"].isin(pd.Series(question_ids)).to_numpy()
+    if since_ms is not None:
+        keep &= chunk["timestamp_ms"].to_numpy() >= since_ms
+    if until_ms is not None:
+        keep &= chunk["timestamp_ms"].to_numpy() < until_ms
+    return chunk if keep.all() else chunk.loc[keep]
+
+
+def read_responses(
+    log_file: Path,
+    question_ids: Optional[Iterable[str]] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    chunk_size: int = READ_CHUNK_SIZE,
+    with_timestamps: bool = True,
+) -> Iterator[pd.DataFrame]:
+    """Yields the logged responses in chunks, oldest first, as frames with `COLUMNS`.
+
+    Covers the rotated segments of `log_file` and `log_file` itself. Only the
+    responses to `question_ids` and from `[since, until)` are returned, if given.
+    Columnar segments that cannot match are skipped after reading their
+    question dictionary and time range; CSV files are read in full. Without
+    `with_timestamps` the CSV time stamps are not parsed and the frames may lack
+    the "timestamp_ms" column.
+    """
+    wanted = None if question_ids is None else np.asarray(list(question_ids), str)
+    since_ms = None if since is None else int(since.timestamp() * 1000)
+    until_ms = None if until is None else int(until.timestamp() * 1000)
+    sources = rotated_logs(log_file)
+    if log_file.is_file():
+        sources.append(log_file)
+    for path in sources:
+        if path.suffix == SEGMENT_SUFFIX:
+            segment = _read_segment(path, wanted, since_ms, until_ms)
+            if segment is not None:
+                yield segment
+            continue
+        with_timestamps = (
+            with_timestamps or since_ms is not None or until_ms is not None
+        )
+        for chunk in _read_csv(path, chunk_size, with_timestamps):
+            chunk = _filter(chunk, wanted, since_ms, until_ms)
+            if len(chunk):
+                yield chunk
@@ -0,0 +1,171 @@
+# Headless benchmark of the question selection: synthetic learners answer the
+# questions picked by `get_question`, and the harness times every step.
+from __future__ import annotations
+
+import random
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from .orthography_questions import QuestionGeneratorForOrthography
+
+# Letters that never form a placeholder, used to spell synthetic words.
+SYNTHETIC_ALPHABET = "abdefgijklmnopstwy"
+SYNTHETIC_PLACEHOLDERS = ("ż", "rz", "ch", "h", "ó", "u")
+LATENCY_PERCENTILES = (50, 90, 99, 100)
+
+
+def synthetic_words(count: int) -> Iterator[str]:
+    """`count` distinct words with one placeholder each, i.e. one question each."""
+    for i in range(count):
+        stem = []
+        n = i
+        while True:
+            n, digit = divmod(n, len(SYNTHETIC_ALPHABET))
+            stem.append(SYNTHETIC_ALPHABET[digit])
+            if n == 0:
+                break
+        yield "".join(stem) + SYNTHETIC_PLACEHOLDERS[i % len(SYNTHETIC_PLACEHOLDERS)]
+
+
+class SimulatedLearner:
+    """A learner who answers question `row` wrongly with probability `error_rates[row]`.
+
+    The initial error rates are drawn from Beta(`error_alpha`, `error_beta`).
+    After each answer the error rate of that question drops by the fraction
+    `learning_rate`.
+    """
+
+    def __init__(
+        self,
+        question_count: int,
+        seed: int = 0,
+        error_alpha: float = 2.0,
+        error_beta: float = 5.0,
+        learning_rate: float = 0.05,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.error_rates = self.rng.beta(error_alpha, error_beta, question_count)
+        self.learning_rate = learning_rate
+
+    def answer(self, row: int) -> bool:
+        correct = bool(self.rng.random() >= self.error_rates[row])
+        self.error_rates[row] *= 1 - self.learning_rate
+        return correct
+
+    @property
+    def true_score(self) -> float:
+        """The learner's expected share of correct answers over the whole bank."""
+        return float(1 - self.error_rates.mean())
+
+
+class ScorePoint(BaseModel):
+    answers: int
+    score: float  # `get_score` of the generator.
+    true_score: float  # `SimulatedLearner.true_score`.
+
+
+class SimulationReport(BaseModel):
+    """Throughput, latencies (in microseconds, by percentile) and score trajectory."""
+
+    questions: int
+    answers: int
+    setup_seconds: float  # Building the question bank.
+    seconds: float  # Answering, including the learner.
+    answers_per_second: float
+    selection_us: dict[int, float]  # `get_question`.
+    update_us: dict[int, float]  # `update_question`.
+    score_us: dict[int, float]  # `get_score`.
+    trajectory: list[ScorePoint]
+
+
+def build_bank(
+    question_count: int, dictionary: Optional[Path] = None
+) -> QuestionGeneratorForOrthography:
+    """A bank of `question_count` synthetic questions, or the questions of `dictionary`."""
+    generator = QuestionGeneratorForOrthography()
+    if dictionary is not None:
+        generator.add_dictionary(dictionary)
+    else:
+        generator.ingest(synthetic_words(question_count))
+    return generator
+
+
+def _percentiles(samples: list[float]) -> dict[int, float]:
+    values = np.percentile(np.asarray(samples) * 1e6, LATENCY_PERCENTILES)
+    return dict(zip(LATENCY_PERCENTILES, values.round(1).tolist()))
+
+
+def simulate(
+    generator: QuestionGeneratorForOrthography,
+    learner: SimulatedLearner,
+    answers: int,
+    report_every: int = 1000,
+    setup_seconds: float = 0.0,
+) -> SimulationReport:
+    """Lets `learner` answer `answers` questions picked by `generator.get_question`."""
+    index = generator.questions.scores.index
+    clock = time.perf_counter
+    selection, update, score = [], [], []
+    trajectory = [
+        ScorePoint(
+            answers=0, score=generator.get_score(), true_score=learner.true_score
+        )
+    ]
+
+    started = clock()
+    for step in range(1, answers + 1):
+        t0 = clock()
+        question = generator.get_question()
+        t1 = clock()
+        correct = learner.answer(index[question.problem_ID])
+        t2 = clock()
+        generator.update_question(question, correct)
+        t3 = clock()
+        selection.append(t1 - t0)
+        update.append(t3 - t2)
+        if step % report_every == 0 or step == answers:
+            t4 = clock()
+            current_score = generator.get_score()
+            score.append(clock() - t4)
+            trajectory.append(
+                ScorePoint(
+                    answers=step, score=current_score, true_score=learner.true_score
+                )
+            )
+    seconds = clock() - started
+
+    return SimulationReport(
+        questions=len(generator.questions),
+        answers=answers,
+        setup_seconds=setup_seconds,
+        seconds=seconds,
+        answers_per_second=answers / seconds if seconds else 0.0,
+        selection_us=_percentiles(selection or [0.0]),
+        update_us=_percentiles(update or [0.0]),
+        score_us=_percentiles(score or [0.0]),
+        trajectory=trajectory,
+    )
+
+
+def run_simulation(
+    question_count: int,
+    answers: int,
+    seed: int = 0,
+    dictionary: Optional[Path] = None,
+    learning_rate: float = 0.05,
+    report_every: int = 1000,
+) -> SimulationReport:
+    """Builds a bank and a learner and runs `simulate`, all reproducible from `seed`."""
+    random.seed(seed)  # The selection salts.
+    np.random.seed(seed)
+    started = time.perf_counter()
+    generator = build_bank(question_count, dictionary)
+    setup_seconds = time.perf_counter() - started
+    learner = SimulatedLearner(
+        len(generator.questions), seed=seed, learning_rate=learning_rate
+    )
+    return simulate(generator, learner, answers, report_every, setup_seconds)
@@ -0,0 +1,156 @@
+# A minimal benchmark harness: `bench` times a callable, compares the median time
+# with the stored baseline and fails the test when it is slower by more than the
+# threshold.
+#
+#   pytest tests/benchmarks --run-benchmarks                   # Compare.
+#   pytest tests/benchmarks --run-benchmarks --benchmark-save  # Store a baseline.
+#
+# Times are stored as multiples of a fixed reference workload that is timed along
+# with every round, so changes of the machine's speed between and during runs
+# cancel out. Baselines are still best compared on the machine that recorded them.
+from __future__ import annotations
+
+import json
+import math
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, cast
+
+import pytest
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_THRESHOLD = 1.5
+MIN_ROUND_SECONDS = 0.05  # Shorter rounds are dominated by timer and scheduler noise.
+REFERENCE_SIZE = 20000
+
+_results: dict[str, float] = {}
+
+
+def _reference_workload():
+    """Dict, string and sorting work, like the quiz's hot paths (~10ms)."""
+    counts = {f"w{i}": i * 7919 % 1013 for i in range(REFERENCE_SIZE)}
+    sorted(counts, key=counts.__getitem__)
+
+
+def _timed(function: Callable[[], object], number: int = 1) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - started) / number
+
+
+def pytest_addoption(parser: pytest.Parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--run-benchmarks", action="store_true", help="Run tests/benchmarks."
+    )
+    group.addoption(
+        "--benchmark-save",
+        action="store_true",
+        help="Store the measured times as the new baseline.",
+    )
+    group.addoption(
+        "--benchmark-baseline",
+        type=Path,
+        default=BASELINE_PATH,
+        help="JSON file with the baseline times.",
+    )
+    group.addoption(
+        "--benchmark-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fail when a time exceeds its baseline by this factor.",
+    )
+    group.addoption(
+        "--benchmark-sizes",
+        default=DEFAULT_SIZES,
+        help="Comma-separated dictionary sizes.",
+    )
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]):
+    if config.getoption("--run-benchmarks", default=False):
+        return
+    skip = pytest.mark.skip(reason="benchmarks run with --run-benchmarks")
+    for item in items:
+        if Path(__file__).parent in Path(item.path).parents:
+            item.add_marker(skip)
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc):
+    if "size" in metafunc.fixturenames:
+        sizes = cast(
+            str, metafunc.config.getoption("--benchmark-sizes", default=DEFAULT_SIZES)
+        )
+        metafunc.parametrize(
+            "size", [int(size) for size in sizes.split(",")], scope="session"
+        )
+
+
+def _load_baseline(config: pytest.Config) -> dict[str, float]:
+    path = cast(Path, config.getoption("--benchmark-baseline"))
+    if not path.is_file():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["results"]
+
+
+@pytest.fixture
+def bench(request: pytest.FixtureRequest) -> Callable[..., float]:
+    """`bench(function, rounds=5, number=1)`: times `rounds` rounds of at least
+    `number` calls and checks the median time per call, relative to the reference
+    workload, against the baseline of this test. Returns the median in seconds.
+
+    A first, untimed call warms caches and lazily built indexes and sets how many
+    calls make a round of at least `MIN_ROUND_SECONDS`. Every round is paired with
+    a timing of `_reference_workload`.
+    """
+    config = request.config
+    key = request.node.nodeid.split("::", 1)[1]
+
+    def run(function: Callable[[], object], rounds: int = 5, number: int = 1) -> float:
+        warm_up = _timed(function)
+        number = max(number, math.ceil(MIN_ROUND_SECONDS / max(warm_up, 1e-9)))
+        timings, relative = [], []
+        for _ in range(rounds):
+            reference = _timed(_reference_workload)
+            timings.append(_timed(function, number))
+            relative.append(timings[-1] / reference)
+        median = statistics.median(relative)
+        _results[key] = median
+        baseline = _load_baseline(config).get(key)
+        threshold = cast(float, config.getoption("--benchmark-threshold"))
+        if (
+            baseline is not None
+            and not config.getoption("--benchmark-save")
+            and median > baseline * threshold
+        ):
+            pytest.fail(
+                f"{key} took {median:.4g} reference workloads, over {threshold}x "
+                f"its baseline of {baseline:.4g}"
+            )
+        return statistics.median(timings)
+
+    return run
+
+
+def pytest_sessionfinish(session: pytest.Session):
+    config = session.config
+    if not _results or not config.getoption("--benchmark-save", default=False):
+        return
+    path = cast(Path, config.getoption("--benchmark-baseline"))
+    results = _load_baseline(config)
+    results.update(_results)
+    baseline = {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+        },
+        # Median time per call, in multiples of the reference workload.
+        "unit": "reference workload",
+        "results": dict(sorted(results.items())),
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
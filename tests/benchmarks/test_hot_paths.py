@@ -0,0 +1,97 @@
+import itertools
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pydantic import TypeAdapter
+
+from Ortografia import UserContext
+from Ortografia.orthography_questions import (
+    OrthographyQuestion,
+    QuestionGeneratorForOrthography,
+)
+from Ortografia.persistence import save_state
+from Ortografia.simulation import SimulatedLearner, simulate, synthetic_words
+
+
+@pytest.fixture(scope="session")
+def dictionary(size: int, tmp_path_factory: pytest.TempPathFactory) -> Path:
+    path = tmp_path_factory.mktemp("dictionaries") / f"{size}.txt"
+    path.write_text("\n".join(synthetic_words(size)) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture(scope="session")
+def generator(dictionary: Path, size: int) -> QuestionGeneratorForOrthography:
+    """A bank with 10 answers per 100 questions, so the counters are not all zero."""
+    random.seed(0)
+    np.random.seed(0)
+    ans = QuestionGeneratorForOrthography()
+    ans.add_dictionary(dictionary)
+    simulate(ans, SimulatedLearner(size, seed=0), answers=max(size // 10, 100))
+    return ans
+
+
+@pytest.fixture(scope="session")
+def state_path(
+    generator: QuestionGeneratorForOrthography,
+    size: int,
+    tmp_path_factory: pytest.TempPathFactory,
+) -> Path:
+    path = tmp_path_factory.mktemp("states") / f"{size}.json"
+    save_state(generator, path)
+    return path
+
+
+def test_from_str(bench, dictionary: Path):
+    words = dictionary.read_text(encoding="utf-8").split()
+    bench(lambda: [OrthographyQuestion.FromStr(word) for word in words])
+
+
+def test_add_dictionary(bench, dictionary: Path):
+    bench(lambda: QuestionGeneratorForOrthography().add_dictionary(dictionary))
+
+
+def test_get_worst_questions(bench, generator: QuestionGeneratorForOrthography):
+    bench(lambda: generator.get_worst_questions(20, add_salt=True, add_decay=True))
+
+
+def test_get_question(bench, generator: QuestionGeneratorForOrthography):
+    bench(generator.get_question, number=1000)
+
+
+def test_update_question(bench, generator: QuestionGeneratorForOrthography):
+    # Answers on a clone, so the session-wide bank stays as built for later tests.
+    clone = generator.clone()
+    question = clone.get_question()
+    bench(lambda: clone.update_question(question, True), number=1000)
+
+
+def test_get_score(bench, generator: QuestionGeneratorForOrthography):
+    bench(generator.get_score, number=1000)
+
+
+def test_json_dump(bench, generator: QuestionGeneratorForOrthography):
+    bench(generator.model_dump_json)
+
+
+def test_json_validate(bench, state_path: Path):
+    adapter = TypeAdapter(QuestionGeneratorForOrthography)
+    json_str = state_path.read_text(encoding="utf-8")
+    bench(lambda: adapter.validate_json(json_str))
+
+
+@pytest.mark.parametrize("depth", [20, 0])
+def test_get_report(bench, state_path: Path, size: int, depth: int):
+    context = UserContext(state_path)
+    context.get_report(depth)
+    # Alternating depths defeats the report cache, so every call builds the table
+    # and diffs the state against the previous one.
+    depths = itertools.cycle([depth + 1, depth] if depth else [size - 1, size])
+    bench(lambda: context.get_report(next(depths)))
+
+
+def test_build_state(bench, state_path: Path):
+    context = UserContext(state_path)
+    bench(context._build_state)
@@ -1,11 +1,13 @@
 from pathlib import Path
 
+import pytest
 from rich.console import Console
 
 from Ortografia import UserContext
 import time
 
 
+@pytest.mark.skip(reason="Manual: watches the real quiz state forever")
 def test_analyze():
     console = Console(color_system="truecolor")
     state_path = Path(__file__).parent / "quiz_state.json"
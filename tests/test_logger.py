@@ -0,0 +1,68 @@
+import csv
+import time
+from pathlib import Path
+
+from Ortografia.background_writer import BackgroundWriter
+from Ortografia.logger import Durability, ResponseLogger
+
+
+def read_rows(path: Path) -> list[list[str]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_buffered_logger_writes_in_batches(tmp_path: Path):
+    log_file = tmp_path / "responses.csv"
+    with ResponseLogger(log_file, buffer_size=3) as logger:
+        assert len(read_rows(log_file)) == 1  # Just the header.
+        logger.log_response(1, "_aba", "ż", True)
+        logger.log_response(2, "mo_e", "ż", False)
+        assert len(read_rows(log_file)) == 1
+        logger.log_response(3, "_ór", "h", False)
+        assert len(read_rows(log_file)) == 4
+        logger.log_response(4, "_aba", "ż", True)
+    rows = read_rows(log_file)
+    assert [row[1:] for row in rows[1:]] == [
+        ["1", "_aba", "ż", "True"],
+        ["2", "mo_e", "ż", "False"],
+        ["3", "_ór", "h", "False"],
+        ["4", "_aba", "ż", "True"],
+    ]
+    logger.close()  # Closing twice is harmless.
+
+    with ResponseLogger(log_file, durability=Durability.FSYNC) as logger:
+        logger.log_response(5, "_aba", "rz", False)
+        assert len(read_rows(log_file)) == 6  # No second header.
+
+
+def test_logger_flushes_by_time(tmp_path: Path):
+    log_file = tmp_path / "responses.csv"
+    logger = ResponseLogger(log_file, buffer_size=100, flush_interval=0)
+    logger.log_response(1, "_aba", "ż", True)  # The batch is already due.
+    assert len(read_rows(log_file)) == 2
+    logger.close()
+
+
+def test_logger_flushes_by_time_without_new_responses(tmp_path: Path):
+    log_file = tmp_path / "responses.csv"
+    with BackgroundWriter() as writer:
+        logger = ResponseLogger(
+            log_file, buffer_size=100, flush_interval=0.05, background_writer=writer
+        )
+        with writer.lock:
+            logger.log_response(1, "_aba", "ż", True)
+        deadline = time.monotonic() + 5
+        while len(read_rows(log_file)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(read_rows(log_file)) == 2
+        logger.close()
+
+
+def test_logger_writes_in_background(tmp_path: Path):
+    log_file = tmp_path / "responses.csv"
+    with BackgroundWriter() as writer:
+        logger = ResponseLogger(log_file, buffer_size=2, background_writer=writer)
+        for epoch in range(5):
+            logger.log_response(epoch, "_aba", "ż", True)
+        logger.close()
+    assert [row[1] for row in read_rows(log_file)[1:]] == ["0", "1", "2", "3", "4"]
@@ -0,0 +1,144 @@
+import gzip
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+from rich.text import Text
+
+from Ortografia.ifaces import IncorrectInputError
+from Ortografia.orthography_questions import (
+    OrthographyQuestion,
+    PlaceholderType,
+    QuestionGeneratorForOrthography,
+    spec_problem_IDs,
+    tokenize_word,
+    tokenize_words,
+)
+from Ortografia.persistence import load_state, save_state
+
+
+def test_tokenize_word():
+    word, placeholders = tokenize_word("przechodzę")
+    assert word == "p_e_odzę"
+    assert placeholders == (
+        (1, PlaceholderType.RZ.value, True, "rz"),
+        (3, PlaceholderType.CH.value, True, "ch"),
+    )
+    assert tokenize_word("przechodzę", [PlaceholderType.U]) == ("przechodzę", ())
+    with pytest.raises(ValueError):
+        tokenize_word("Rzeka")
+    with pytest.raises(ValueError):
+        tokenize_word("a_b")
+
+
+def test_batch_tokenizer_matches_questions():
+    words = (
+        Path(__file__)
+        .parent.joinpath("test_words.txt")
+        .read_text(encoding="utf-8")
+        .split()
+    )
+    for word, spec in zip(words, tokenize_words(words)):
+        questions = OrthographyQuestion.FromStr(word)
+        assert [q.problem_ID for q in questions] == spec_problem_IDs(spec)
+        assert all(q.get_correct_word_str() == word for q in questions)
+
+
+def test_ingest_streams_and_counts(tmp_path: Path):
+    compressed = tmp_path / "words.txt.gz"
+    with gzip.open(compressed, "wt", encoding="utf-8") as file:
+        file.write("żaba\n\nżaba\nRzeka\nmorze\n")
+
+    generator = QuestionGeneratorForOrthography()
+    assert generator.add_dictionary(compressed) == 2
+
+    report = generator.ingest(word for word in ["morze", "a_b", "chór"])
+    assert (report.words, report.added, report.duplicates) == (3, 2, 1)
+    assert report.invalid_words == 1
+    assert len(generator.questions) == 4
+
+
+def test_parallel_ingest_matches_sequential():
+    words = (
+        Path(__file__)
+        .parent.joinpath("polish_frequent_words.txt")
+        .read_text(encoding="utf-8")
+    )
+    lines = words.splitlines() * 2 + ["Rzeka"]
+    sequential = QuestionGeneratorForOrthography()
+    parallel = QuestionGeneratorForOrthography()
+    assert sequential.ingest(lines) == parallel.ingest(lines, jobs=3)
+    assert sequential.model_dump_json() == parallel.model_dump_json()
+
+
+def test_id_suffixes_after_reload(tmp_path: Path):
+    # Without the U placeholder "hu" is masked as "_u"; with it as "__", whose
+    # question for the first placeholder has the same problem ID "_u".
+    generator = QuestionGeneratorForOrthography()
+    generator.ingest(["hu", "hu1"], [PlaceholderType.CH])
+    assert list(generator.questions) == ["_u", "_u1"]
+
+    state_path = tmp_path / "quiz_state.json"
+    save_state(generator, state_path)
+    reloaded = load_state(state_path)
+    reloaded.ingest(["hu"])
+    assert list(reloaded.questions) == ["_u", "_u1", "_u2", "h_"]
+    assert reloaded.questions["_u2"].question.word == "__"
+
+
+def test_cached_word_strings():
+    question = OrthographyQuestion.FromStr("przechodzę")[1]
+    fresh = question.model_dump()
+    assert question.problem_ID == "prze_odzę"
+    assert question.get_correct_word_str() == "przechodzę"
+    assert question.model_dump() == fresh
+
+    question.id_suffix = "1"
+    assert question.problem_ID == "prze_odzę1"
+
+
+def test_render_word_is_cached():
+    question = OrthographyQuestion.FromStr("przechodzę")[1]
+    masked = question.get_word_masked_on_target()
+    assert masked.markup == "prze[bold on blue]_[/bold on blue]odzę"
+    assert question.get_word_masked_on_target() is masked
+    assert question.get_ambiguous_word().markup == (
+        "p[bold]rz/ż[/bold]e[bold on blue]ch/h[/bold on blue]odzę"
+    )
+
+
+def test_parse_user_response():
+    question = OrthographyQuestion.FromStr("Czy możesz wstać?")[0]
+    assert question.parse_user_response(" Ż ").is_correct
+    assert not question.parse_user_response("rz").is_correct
+    assert question.parse_user_response("z\u0307").is_correct  # Decomposed "ż".
+    assert question.parse_user_response(
+        "CZY MOŻESZ WSTAĆ?"
+    ).is_correct  # Capitalized words match too.
+    with pytest.raises(IncorrectInputError):
+        question.parse_user_response("z")
+
+
+def test_sibling_questions_share_placeholders():
+    first, second = OrthographyQuestion.FromStr("przechodzę")
+    assert first.placeholders is second.placeholders
+    assert first.word is second.word
+    (_, rz), (_, ch) = first.placeholders
+    assert OrthographyQuestion.FromStr("rzeka")[0].target_placeholder is rz
+    with pytest.raises(ValidationError):
+        ch.content = "h"
+
+
+def test_store_short_user_prompt():
+    generator = QuestionGeneratorForOrthography()
+    generator.ingest(
+        ["przechodzę", "hu", "hu"], [PlaceholderType.CH, PlaceholderType.RZ]
+    )
+    store = generator.questions
+    for problem_ID in store:
+        expected = store[problem_ID].question.short_user_prompt_string()
+        assert store.short_user_prompt(problem_ID) == expected
+    markups = store.short_user_prompt_markups(list(store))
+    assert [Text.from_markup(m) for m in markups] == [
+        store.short_user_prompt(problem_ID) for problem_ID in store
+    ]
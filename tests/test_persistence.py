@@ -0,0 +1,236 @@
+import functools
+import json
+import random
+import threading
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from Ortografia import QuestionGeneratorForOrthography, load_questions
+from Ortografia.background_writer import BackgroundWriter
+from Ortografia.binary_state import FORMAT_VERSION, is_binary_state
+from Ortografia.persistence import (
+    StateJournal,
+    convert_state,
+    journal_path,
+    load_state,
+    save_state,
+)
+
+DICTIONARY = Path(__file__).parent / "polish_frequent_words.txt"
+
+
+def _load_questions(path: Path = DICTIONARY) -> QuestionGeneratorForOrthography:
+    generator = load_questions(path)
+    assert isinstance(generator, QuestionGeneratorForOrthography)
+    return generator
+
+
+def _counters(generator) -> dict[str, tuple[int, int, int]]:
+    return {
+        k: (q.correct_count, q.incorrect_count, q.last_epoch)
+        for k, q in generator.questions.items()
+    }
+
+
+def test_journal_recovers_after_crash(tmp_path: Path):
+    state_path = tmp_path / "quiz_state.json"
+    save_state(_load_questions(), state_path)
+
+    random.seed(0)
+    journal = StateJournal(state_path, compact_every=40)
+    generator = journal.open()
+    for _ in range(100):
+        question = generator.get_question()
+        epoch = generator.current_epoch
+        correct = random.random() < 0.5
+        generator.update_question(question, correct)
+        journal.record(generator, epoch, question.problem_ID, correct)
+
+    # Simulate a crash in the middle of appending a record.
+    with open(journal_path(state_path), "a", encoding="utf-8") as file:
+        file.write('[100, "pr')
+
+    recovered = StateJournal(state_path).open()
+    assert recovered.current_epoch == generator.current_epoch
+    assert _counters(recovered) == _counters(generator)
+
+    # Records already folded into the snapshot are not applied twice.
+    with open(journal_path(state_path), "a", encoding="utf-8") as file:
+        file.write('[0, "si_", true]\n')
+    assert _counters(load_state(state_path)) == _counters(generator)
+
+
+def test_binary_state_round_trip(tmp_path: Path):
+    random.seed(0)
+    generator = _load_questions()
+    for _ in range(50):
+        generator.update_question(generator.get_question(), random.random() < 0.5)
+    json_path = tmp_path / "quiz_state.json"
+    binary_path = tmp_path / "quiz_state.bin"
+    save_state(generator, json_path)
+
+    convert_state(json_path, binary_path)
+    assert is_binary_state(binary_path)
+    loaded = load_state(binary_path)
+    assert loaded.current_epoch == generator.current_epoch
+    assert loaded.model_dump() == generator.model_dump()
+
+    convert_state(binary_path, tmp_path / "round_trip.json")
+    assert (
+        load_state(tmp_path / "round_trip.json").model_dump() == generator.model_dump()
+    )
+
+
+@pytest.mark.parametrize("field", ["correct_count", "question"])
+def test_corrupt_state_is_a_validation_error(tmp_path: Path, field: str):
+    state_path = tmp_path / "quiz_state.json"
+    save_state(_load_questions(), state_path)
+    state = json.loads(state_path.read_text(encoding="utf-8"))
+    problem_ID = next(iter(state["questions"]))
+    del state["questions"][problem_ID][field]
+    state_path.write_text(json.dumps(state), encoding="utf-8")
+
+    with pytest.raises(ValidationError, match=problem_ID):
+        load_state(state_path)
+
+
+def test_only_the_current_binary_format_is_read(tmp_path: Path):
+    binary_path = tmp_path / "quiz_state.bin"
+    save_state(_load_questions(), binary_path)
+    data = bytearray(binary_path.read_bytes())
+    data[8:12] = (FORMAT_VERSION - 1).to_bytes(4, "little")
+    binary_path.write_bytes(data)
+    with pytest.raises(ValueError, match="version"):
+        load_state(binary_path)
+
+
+def test_binary_state_is_read_lazily(tmp_path: Path):
+    generator = _load_questions()
+    binary_path = tmp_path / "quiz_state.bin"
+    save_state(generator, binary_path)
+
+    loaded = load_state(binary_path)
+    loaded.questions.cache_size = 8
+    for problem_ID in list(generator.questions)[:20]:
+        assert loaded.questions[problem_ID] == generator.questions[problem_ID]
+    assert len(loaded.questions._cache) == 8
+
+    # Questions added after loading are stored alongside the mapped ones.
+    extra = _load_questions(Path(__file__).parent / "test_words_small.txt")
+    for problem_ID, q in extra.questions.items():
+        if problem_ID not in loaded.questions:
+            loaded.add_question(q.question)
+    save_state(loaded, binary_path)
+    assert load_state(binary_path).model_dump() == loaded.model_dump()
+
+
+def test_journal_in_background(tmp_path: Path):
+    for background in [False, True]:
+        state_path = tmp_path / f"{background}.json"
+        save_state(_load_questions(), state_path)
+        writer = BackgroundWriter(max_pending=4) if background else None
+        journal = StateJournal(state_path, compact_every=30, background_writer=writer)
+        generator = journal.open()
+        random.seed(0)
+        for _ in range(100):
+            with writer.lock if writer else threading.Lock():
+                question = generator.get_question()
+                epoch = generator.current_epoch
+                correct = random.random() < 0.5
+                generator.update_question(question, correct)
+                journal.record(generator, epoch, question.problem_ID, correct)
+        if writer is not None:
+            writer.flush()
+            # A crash here would leave the snapshot plus the journal tail.
+            assert _counters(load_state(state_path)) == _counters(generator)
+        journal.close(generator)
+        if writer is not None:
+            writer.close()
+        assert journal_path(state_path).read_text(encoding="utf-8") == ""
+        assert _counters(load_state(state_path)) == _counters(generator)
+
+
+def test_background_snapshots_are_coalesced(tmp_path: Path):
+    state_path = tmp_path / "quiz_state.json"
+    generator = _load_questions()
+    written = []
+    with BackgroundWriter() as writer:
+        with writer.lock:  # Keeps the worker from copying the first snapshot.
+            for epoch in range(5):
+                generator.current_epoch = epoch
+                save_state(generator, state_path, background_writer=writer)
+            writer.submit(lambda: written.append(load_state(state_path)))
+    assert [g.current_epoch for g in written] == [4]
+
+    def fail():
+        raise ZeroDivisionError
+
+    writer = BackgroundWriter()
+    writer.submit(fail)
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_snapshot_is_serialized_outside_the_lock(tmp_path: Path):
+    generator = _load_questions()
+    serializing, answered = threading.Event(), threading.Event()
+
+    def serialize(snapshot) -> str:
+        serializing.set()
+        assert answered.wait(5)
+        return snapshot.model_dump_json()
+
+    with BackgroundWriter() as writer:
+        writer.save_snapshot(tmp_path / "quiz_state.json", generator.clone, serialize)
+        assert serializing.wait(5)
+        # The state can change while the snapshot is serialized ...
+        assert writer.lock.acquire(timeout=5)
+        generator.update_question(generator.get_question(), True)
+        writer.lock.release()
+        answered.set()
+    # ... without affecting the snapshot.
+    assert load_state(tmp_path / "quiz_state.json").current_epoch == 0
+    assert generator.current_epoch == 1
+
+
+def test_tasks_submitted_under_the_lock_do_not_deadlock(tmp_path: Path):
+    generator = _load_questions()
+    started, go_on = threading.Event(), threading.Event()
+    done = []
+
+    def busy():
+        started.set()
+        go_on.wait(5)
+
+    writer = BackgroundWriter(max_pending=2)
+    writer.submit(busy)
+    assert started.wait(5)
+    save_state(generator, tmp_path / "quiz_state.json", background_writer=writer)
+
+    def answer():
+        with writer.lock:
+            go_on.set()  # The worker now waits for the lock to take the snapshot.
+            for i in range(10):
+                writer.submit(functools.partial(done.append, i))
+
+    thread = threading.Thread(target=answer, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    writer.close()
+    assert done == list(range(10))
+    assert load_state(tmp_path / "quiz_state.json").model_dump() == (
+        generator.model_dump()
+    )
+
+
+def test_clone_is_independent():
+    generator = _load_questions()
+    clone = generator.clone()
+    assert clone.model_dump() == generator.model_dump()
+    clone.update_question(clone.get_question(), False)
+    clone.add_dictionary(["żółw"])
+    assert _counters(generator) == _counters(_load_questions())
+    assert len(clone) > len(generator)
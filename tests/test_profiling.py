@@ -0,0 +1,47 @@
+import json
+from typing import cast
+
+import pytest
+
+from Ortografia import profiling
+from Ortografia.orthography_questions import OrthographyQuestion
+from Ortografia.simulation import build_bank
+
+
+@pytest.fixture
+def profiler():
+    profiling.reset()
+    profiling.enable(report_at_exit=False)
+    yield profiling
+    profiling.disable()
+    profiling.reset()
+
+
+def test_nothing_is_recorded_while_disabled():
+    profiling.reset()
+    generator = build_bank(50)
+    generator.update_question(generator.get_question(), True)
+    with profiling.timed("block"):
+        pass
+    assert profiling.summary() == {}
+
+
+def test_hot_paths_are_timed(profiler, tmp_path):
+    generator = build_bank(50)
+    for _ in range(10):
+        question = cast(OrthographyQuestion, generator.get_question())
+        response = question.parse_user_response(question.get_correct_word_str())
+        generator.update_question(question, response.is_correct)
+    with profiler.timed("block"):
+        pass
+
+    stats = profiler.summary()
+    assert {"ingest", "select", "update", "parse", "block"} <= set(stats)
+    assert stats["select"]["count"] == stats["update"]["count"] == 10
+    select = stats["select"]
+    assert sum(select["histogram_us"].values()) == 10
+    assert select["min_us"] <= select["p50_us"] <= select["p99_us"] <= select["max_us"]
+
+    profiler.dump_json(tmp_path / "profile.json")
+    assert json.loads((tmp_path / "profile.json").read_text(encoding="utf-8")) == stats
+    assert profiler.summary_table().row_count == len(stats)
@@ -0,0 +1,145 @@
+import collections
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+from scipy.special import betaincinv
+
+from Ortografia import load_questions, QuestionGenerator
+from Ortografia.beta_scoring_function import (
+    exact_quantile_table,
+    interpolated_quantile_table,
+)
+from Ortografia.priority_index import PriorityIndex
+from Ortografia.question_selection import (
+    CORRECTNESS_QUANTILES,
+    DECAY_FACTOR,
+    QuestionWithScore,
+)
+
+
+def _played_generator(answers: int = 200) -> QuestionGenerator:
+    random.seed(0)
+    generator = load_questions(Path(__file__).parent / "polish_frequent_words.txt")
+    for _ in range(answers):
+        question = generator.get_question()
+        generator.update_question(question, random.random() < 0.7)
+    return generator
+
+
+def test_worst_questions_match_scalar_scores():
+    generator = _played_generator()
+
+    expected = sorted(
+        generator.questions.values(),
+        key=lambda q: q.get_score_for_selection(generator.current_epoch, False),
+    )
+    worst = generator.get_worst_questions(20, add_salt=False, add_decay=True)
+    assert [q.question.problem_ID for q in worst] == [
+        q.question.problem_ID for q in expected[:20]
+    ]
+
+    expected = sorted(
+        generator.questions.values(), key=lambda q: q.get_correctness_score()
+    )
+    worst = generator.get_worst_questions(
+        len(generator), add_salt=False, add_decay=False
+    )
+    assert [q.question.problem_ID for q in worst] == [
+        q.question.problem_ID for q in expected
+    ]
+
+
+def test_answer_count_follows_updates():
+    generator = _played_generator(50)
+    assert sum(generator.answer_count) == 50
+    assert generator.answer_count == (
+        sum(q.correct_count for q in generator.questions.values()),
+        sum(q.incorrect_count for q in generator.questions.values()),
+    )
+
+
+def test_quantile_table_matches_scipy():
+    positive = np.array([0, 3, 10, 200, 5000])
+    negative = np.array([0, 1, 50, 3, 20])
+    exact = exact_quantile_table(0.2)
+    assert np.allclose(
+        exact.quantiles(positive, negative),
+        betaincinv(1 + positive, 1 + negative, 0.2),
+    )
+    assert exact.quantile(3, 1) == pytest.approx(betaincinv(4, 2, 0.2))
+
+    interpolated = interpolated_quantile_table(0.15, 0.25)
+    CI = np.array([0.15, 0.1734, 0.2, 0.2291, 0.25])
+    assert np.allclose(
+        interpolated.quantiles(positive, negative, CI),
+        betaincinv(1 + positive, 1 + negative, CI),
+        atol=1e-3,
+    )
+
+
+def test_running_score_matches_full_sum():
+    generator = _played_generator(300)
+    full_sum = sum(q.get_correctness_score() for q in generator.questions.values())
+    assert generator._score_arrays().correctness_sum == pytest.approx(full_sum)
+    assert generator.clone().get_score() == pytest.approx(generator.get_score())
+
+
+def test_priority_index_matches_full_rescan_without_salt():
+    random.seed(1)
+    generator = load_questions(Path(__file__).parent / "polish_frequent_words.txt")
+    scores = generator._score_arrays()
+    generator._priority = PriorityIndex(
+        scores,
+        generator.current_epoch,
+        quantile=lambda correct, incorrect, salt: CORRECTNESS_QUANTILES.quantile(
+            correct, incorrect
+        ),
+        salt_amplitude=0.0,
+        decay_factor=DECAY_FACTOR,
+    )
+    for _ in range(600):
+        expected = generator.get_worst_questions(1, add_salt=False, add_decay=True)
+        question = generator.worst_question
+        assert question.question.problem_ID == expected[0].question.problem_ID
+        generator.update_question(question.question, random.random() < 0.6)
+
+
+def test_priority_index_salts_every_selection():
+    np.random.seed(0)
+    generator = _played_generator(300)
+    draws = 3000
+
+    def rescan() -> QuestionWithScore:
+        return generator.get_worst_questions(1, add_salt=True, add_decay=True)[0]
+
+    indexed = collections.Counter(
+        generator.worst_question.question.problem_ID for _ in range(draws)
+    )
+    rescanned = collections.Counter(rescan().question.problem_ID for _ in range(draws))
+    # Without answers in between, only the salt changes the selected question.
+    assert len(indexed) > 1
+    for problem_ID in indexed | rescanned:
+        assert abs(indexed[problem_ID] - rescanned[problem_ID]) < 0.05 * draws
+
+
+def test_worst_question_of_empty_bank_raises_quietly(capsys):
+    with pytest.raises(IndexError, match="no questions"):
+        QuestionGenerator().worst_question
+    assert capsys.readouterr().out == ""
+
+
+def test_score_delta_matches_clone():
+    generator = _played_generator(100)
+    score = generator.get_score()
+    for q in generator.get_worst_questions(10, add_salt=False, add_decay=False):
+        for correct in (True, False):
+            clone = generator.clone()
+            clone.update_question(q.question, correct)
+            assert generator.score_delta(q.question, correct) == pytest.approx(
+                clone.get_score() - score
+            )
+    deltas = generator.score_deltas(True)
+    assert deltas.shape == (len(generator),)
+    assert (deltas >= 0).all()
@@ -0,0 +1,40 @@
+import random
+from pathlib import Path
+
+from Ortografia import QuestionGeneratorForOrthography, load_questions
+from Ortografia.logger import ResponseLogger
+from Ortografia.replay import compare_states, replay_log
+
+DICTIONARY = Path(__file__).parent / "test_words.txt"
+
+
+def _load_questions(path: Path = DICTIONARY) -> QuestionGeneratorForOrthography:
+    generator = load_questions(path)
+    assert isinstance(generator, QuestionGeneratorForOrthography)
+    return generator
+
+
+def test_replay_rebuilds_the_state(tmp_path: Path):
+    log_file = tmp_path / "responses.csv"
+    generator = _load_questions()
+    random.seed(0)
+    with ResponseLogger(log_file, buffer_size=50) as logger:
+        generator.set_logger(logger)
+        for _ in range(300):
+            generator.update_question(generator.get_question(), random.random() < 0.6)
+    with open(log_file, "a", encoding="utf-8") as file:
+        file.write("2024-01-01T00:00:00,300,nieznane_,ż,True\n")
+
+    replayed = _load_questions()
+    report = replay_log(replayed, log_file, chunk_size=7)
+    assert (report.rows, report.applied, report.unknown_questions) == (301, 300, 1)
+    assert compare_states(generator, replayed) == []
+    assert abs(replayed.get_score() - generator.get_score()) < 1e-12
+
+    # Replaying onto an up-to-date bank changes nothing.
+    assert replay_log(replayed, log_file).skipped_old == 300
+    assert compare_states(generator, replayed) == []
+
+    fresh = _load_questions()
+    differences = compare_states(generator, fresh)
+    assert differences[0] == "current epoch: expected 300, got 0"
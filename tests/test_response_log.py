@@ -0,0 +1,91 @@
+import datetime
+import gzip
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Ortografia.logger import ResponseLogger
+from Ortografia.response_log import (
+    ArchiveFormat,
+    read_responses,
+    rotated_logs,
+    to_timestamp_ms,
+    write_segment,
+)
+
+
+def log_answers(logger: ResponseLogger, epochs: range):
+    for epoch in epochs:
+        logger.log_response(epoch, f"q{epoch % 7}", "ż", epoch % 3 != 0)
+
+
+def test_rotation_keeps_every_response(tmp_path: Path):
+    log_file = tmp_path / "responses.csv"
+    for archive, epochs in [
+        (ArchiveFormat.GZIP, range(100)),
+        (ArchiveFormat.COLUMNAR, range(100, 200)),
+    ]:
+        with ResponseLogger(
+            log_file, buffer_size=10, rotate_bytes=1000, archive=archive
+        ) as logger:
+            log_answers(logger, epochs)
+
+    archives = rotated_logs(log_file)
+    assert {path.name.split(".", 2)[-1] for path in archives} == {"csv.gz", "npz"}
+    with gzip.open(archives[0], "rt", encoding="utf-8") as file:
+        assert file.readline().startswith("datetime,epoch")
+
+    log = pd.concat(read_responses(log_file), ignore_index=True)
+    assert log["epoch"].tolist() == list(range(200))
+    assert log["question_id"].tolist() == [f"q{epoch % 7}" for epoch in range(200)]
+    assert log["is_correct"].tolist() == [epoch % 3 != 0 for epoch in range(200)]
+    now_ms = datetime.datetime.now().timestamp() * 1000
+    assert (abs(log["timestamp_ms"] - now_ms) < 60_000).all()
+
+
+def test_segment_reads_skip_what_cannot_match(tmp_path: Path):
+    log_file = tmp_path / "responses.csv"
+    with ResponseLogger(log_file) as logger:
+        log_answers(logger, range(50))
+    segment = tmp_path / "responses.20250101T000000000000.npz"
+    write_segment(log_file, segment)
+    log_file.unlink()
+
+    with np.load(segment) as columns:
+        assert columns["question_ids"].tolist() == [f"q{i}" for i in range(7)]
+        assert columns["epochs"].tolist() == [0, 49]
+    (only_q3,) = read_responses(log_file, question_ids=["q3"])
+    assert only_q3["epoch"].tolist() == list(range(3, 50, 7))
+    assert list(read_responses(log_file, question_ids=["q8"])) == []
+    future = datetime.datetime.now() + datetime.timedelta(hours=1)
+    assert list(read_responses(log_file, since=future)) == []
+    (all_rows,) = read_responses(log_file, until=future)
+    assert len(all_rows) == 50
+
+
+@pytest.fixture
+def warsaw_time(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Warsaw")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_timestamps_across_fall_back(warsaw_time):
+    # On 2024-10-27 the clocks went from 03:00 CEST back to 02:00 CET.
+    local = ["02:30", "02:59", "02:10", "02:40", "03:10"]
+    utc = ["00:30", "00:59", "01:10", "01:40", "02:10"]
+    expected = [
+        int(datetime.datetime.fromisoformat(f"2024-10-27T{t}+00:00").timestamp()) * 1000
+        for t in utc
+    ]
+    times = pd.Series([f"2024-10-27T{t}:00" for t in local])
+    assert to_timestamp_ms(times)[0].tolist() == expected
+    # Chunked: the second chunk starts after the clocks fell back.
+    first, latest = to_timestamp_ms(pd.Series(times[:2]))
+    second, _ = to_timestamp_ms(pd.Series(times[2:]), latest)
+    assert first.tolist() + second.tolist() == expected
@@ -0,0 +1,19 @@
+from Ortografia.simulation import build_bank, run_simulation, synthetic_words
+
+
+def test_synthetic_bank_has_one_question_per_word():
+    words = list(synthetic_words(500))
+    assert len(set(words)) == 500
+    assert len(build_bank(500).questions) == 500
+
+
+def test_simulation_is_reproducible():
+    first = run_simulation(300, 1000, seed=1, report_every=250)
+    second = run_simulation(300, 1000, seed=1, report_every=250)
+    assert first.questions == 300 and first.answers == 1000
+    assert [p.answers for p in first.trajectory] == [0, 250, 500, 750, 1000]
+    assert first.trajectory == second.trajectory
+    # The learner improves and the estimated score follows.
+    assert first.trajectory[-1].true_score > first.trajectory[0].true_score
+    assert first.trajectory[-1].score > first.trajectory[0].score
+    assert first.selection_us[50] <= first.selection_us[100]
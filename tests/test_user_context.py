@@ -0,0 +1,92 @@
+import io
+import random
+from pathlib import Path
+
+import pandas as pd
+from rich.console import Console
+
+from Ortografia import QuestionGeneratorForOrthography, UserContext, load_questions
+from Ortografia.analyze import are_scores_different
+from Ortografia.persistence import StateJournal, save_state
+
+DICTIONARY = Path(__file__).parent / "test_words.txt"
+
+
+def _load_questions(path: Path = DICTIONARY) -> QuestionGeneratorForOrthography:
+    generator = load_questions(path)
+    assert isinstance(generator, QuestionGeneratorForOrthography)
+    return generator
+
+
+def test_user_context_follows_journal(tmp_path: Path):
+    state_path = tmp_path / "quiz_state.json"
+    save_state(_load_questions(), state_path)
+    context = UserContext(state_path)
+    report = context.get_report(10)
+    assert not context.refresh()
+    assert context.get_report(10) is report
+
+    random.seed(0)
+    journal = StateJournal(state_path, compact_every=1000)
+    generator = journal.open()
+    for _ in range(30):
+        question = generator.get_question()
+        epoch = generator.current_epoch
+        correct = random.random() < 0.5
+        generator.update_question(question, correct)
+        journal.record(generator, epoch, question.problem_ID, correct)
+        if epoch % 10 == 0:
+            assert context.refresh()  # Applies only the new journal records.
+    context.refresh()
+    assert context.get_report(10) is not report
+    assert context._gen.model_dump() == generator.model_dump()
+
+    journal.close(generator)  # Writes a new snapshot and empties the journal.
+    assert context.refresh()
+    assert context._gen.model_dump() == generator.model_dump()
+    assert not context.refresh()
+
+
+def test_state_is_worst_first(tmp_path: Path):
+    state_path = tmp_path / "quiz_state.json"
+    generator = _load_questions()
+    random.seed(0)
+    for _ in range(50):
+        generator.update_question(generator.get_question(), random.random() < 0.5)
+    save_state(generator, state_path)
+
+    state = UserContext(state_path).get_state()
+    worst = generator.get_worst_questions(len(generator), False, False)
+    assert state["word"].tolist() == [q.question.problem_ID for q in worst]
+    assert state["ok"].tolist() == [q.correct_count for q in worst]
+    assert state.index.tolist() == list(range(len(worst)))
+
+
+def test_are_scores_different():
+    before = pd.DataFrame({"word": ["a", "b", "c"], "score": [0.1, 0.2, 0.3]})
+    swapped = pd.DataFrame({"word": ["b", "a", "c"], "score": [0.2, 0.1, 0.9]})
+    assert not are_scores_different(1, before, swapped)
+    assert are_scores_different(2, before, swapped)
+    assert are_scores_different(0, before, swapped.iloc[:2])
+
+
+def test_full_report_lists_every_question(tmp_path: Path):
+    state_path = tmp_path / "quiz_state.json"
+    generator = _load_questions()
+    save_state(generator, state_path)
+    context = UserContext(state_path)
+    context.get_report(0)
+
+    random.seed(0)
+    for _ in range(50):
+        generator.update_question(generator.get_question(), random.random() < 0.5)
+    save_state(generator, state_path)
+    report = context.get_report(0)
+    assert report.row_count == len(generator)
+
+    output = io.StringIO()
+    Console(file=output, width=200).print(report)
+    lines = output.getvalue().splitlines()
+    assert len(lines) == len(generator) + 5  # Title, header and borders.
+    assert sum("↑" in line or "↓" in line for line in lines) > 0
+    assert not any("[red]" in line or "[green]" in line for line in lines)